@@ -21,15 +21,23 @@ Text encoding: custom base64 with ASCII-sorted alphabet
 
 from __future__ import annotations
 
+import bisect
+import collections
+import functools
 import hashlib
+import heapq
 import hmac
+import json
+import math
 import os
 import re
 import secrets
+import struct
 import sys
 import threading
 import time
 import uuid as _uuid_mod
+from array import array
 from typing import Optional
 
 # ── Constants ────────────────────────────────────────────────────────
@@ -184,8 +192,65 @@ def _load_iam() -> int:
     return iam_to_32bit(iam)
 
 
+class _HmacTemplate:
+    """按 key 预先构造的 HMAC-SHA256 对象 (hmac.new)。
+
+    key 只在构造时派生一次，之后每次 digest 只需 copy() 并 update 变化的部分。
+    prefixed() 可以把固定前缀也预先 update 进去。
+    """
+
+    __slots__ = ("mac",)
+
+    def __init__(self, mac) -> None:
+        self.mac = mac
+
+    @classmethod
+    def from_key(cls, key: bytes) -> "_HmacTemplate":
+        return cls(hmac.new(key, digestmod=hashlib.sha256))
+
+    def prefixed(self, prefix: bytes) -> "_HmacTemplate":
+        """返回已 update(prefix) 的新模板。"""
+        mac = self.mac.copy()
+        mac.update(prefix)
+        return _HmacTemplate(mac)
+
+    def digest(self, data: bytes) -> bytes:
+        """HMAC-SHA256(key, prefix + data)。"""
+        mac = self.mac.copy()
+        mac.update(data)
+        return mac.digest()
+
+
+@functools.lru_cache(maxsize=16)
+def _hmac_template(key: bytes) -> _HmacTemplate:
+    return _HmacTemplate.from_key(key)
+
+
 def _hmac_sha256(key: bytes, data: bytes) -> bytes:
-    return hmac.new(key, data, hashlib.sha256).digest()
+    return _hmac_template(key).digest(data)
+
+
+_OBS_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=_OBS_CACHE_SIZE)
+def _obs_mask(key: bytes, t48: int) -> bytes:
+    """obs = HMAC-SHA256(key, Time_48)[:6]，按 (key, t48) 做有界 LRU 缓存。
+
+    同一毫秒内生成 / 解码的 ID 共用同一个掩码，命中缓存即可省去一次 HMAC。
+    """
+    return _hmac_sha256(key, t48.to_bytes(6, "big"))[:6]
+
+
+def obs_cache_info() -> dict:
+    """obs 掩码缓存统计：{"hits", "misses", "size", "maxsize"}。"""
+    info = _obs_mask.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+
+
+def obs_cache_clear() -> None:
+    """清空 obs 掩码缓存并重置计数。"""
+    _obs_mask.cache_clear()
 
 
 def _now_ms() -> int:
@@ -208,13 +273,165 @@ class _SeqCounter:
             self._val = (self._val + 1) & _SEQ16_MAX
             return v
 
+    def take(self, n: int) -> int:
+        """一次加锁预留 n 个连续序列号，返回起始值（调用方自行 & 0xFFFF 回绕）。"""
+        with self._lock:
+            v = self._val
+            self._val = (self._val + n) & _SEQ16_MAX
+            return v
+
 
 _seq_counter = _SeqCounter()
 
+
+class _MonotonicSeq:
+    """
+    单调模式 (类 ULID) 的 (时间, 序列号) 分配器。
+
+    - 每毫秒序列号从 0 重新开始
+    - 某毫秒的 65536 个槽位用完后，时间字段借用下一毫秒 (可能略超前于真实时钟)
+    - 各线程以 block 为单位从全局分配器预留自己的槽位块，块内取号无锁
+    - 批量 take() 直接从全局分配器预留，并作废本线程未用完的块
+
+    保证: 同一线程内严格递增 (generate 与 generate_many 混用亦然)；全局唯一。
+    同一毫秒内不同线程的 ID 按各自块的先后排序，而不是按调用的先后排序。
+    """
+
+    def __init__(self, block: int = 256) -> None:
+        self.block = block
+        self._lock = threading.Lock()
+        self._t = -1
+        self._next = 0
+        self._tls = threading.local()
+
+    def _reserve(self, now_ms: int, n: int) -> tuple:
+        """加锁预留至多 n 个同毫秒槽位，返回 (t48, 起始序列号, 数量)。"""
+        with self._lock:
+            if now_ms > self._t:
+                self._t = now_ms
+                self._next = 0
+            elif self._next > _SEQ16_MAX:
+                self._t += 1
+                self._next = 0
+            start = self._next
+            count = min(n, _SEQ16_MAX + 1 - start)
+            self._next = start + count
+            return self._t, start, count
+
+    def next(self, now_ms: int) -> tuple:
+        """返回 (t48, seq16)。线程本地块用尽或时钟前进到新毫秒时才加锁。"""
+        blk = getattr(self._tls, "blk", None)
+        if blk is None or blk[1] >= blk[2] or now_ms > blk[0]:
+            t48, start, count = self._reserve(now_ms, self.block)
+            blk = self._tls.blk = [t48, start, start + count]
+        seq = blk[1]
+        blk[1] = seq + 1
+        return blk[0], seq
+
+    def take(self, now_ms: int, n: int) -> list:
+        """为批量生成预留 n 个槽位，返回 [(t48, 起始序列号, 数量), ...]。"""
+        runs = []
+        while n > 0:
+            run = self._reserve(now_ms, n)
+            runs.append(run)
+            n -= run[2]
+        # 本线程块中剩余的槽位排在这批之前，作废它，之后的 next() 重新预留
+        self._tls.blk = None
+        return runs
+
+
+_monotonic_seq = _MonotonicSeq()
+
+# ── Generator (cached key / IAM) ────────────────────────────────────
+
+
+def _iam_file_sig(path: str) -> Optional[tuple[int, int]]:
+    """IAM.txt 的 (mtime_ns, size)，文件不存在返回 None。"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class Generator:
+    """进程级 ATSIHID 生成器 — 缓存 key 与 IAM，避免每个 ID 都读环境变量和 IAM.txt。
+
+    - key 在环境变量 LEFAC_256 的值变化时重新加载
+    - IAM 在 IAM.txt 的 mtime / size 变化时重新加载
+    - 构造时显式传入 key / iam32 则固定使用，不再重载
+
+    用法：
+        gen = Generator()
+        uid = gen.generate(1)
+        info = gen.decode(uid)
+    """
+
+    def __init__(self, *, key: Optional[bytes] = None, iam32: Optional[int] = None) -> None:
+        self._lock = threading.Lock()
+        self._fixed_key = key
+        self._fixed_iam32 = iam32
+        self._key: Optional[bytes] = key
+        self._key_raw: Optional[str] = None
+        self._iam32: Optional[int] = iam32
+        self._iam_sig: Optional[tuple[int, int]] = None
+
+    def key(self) -> bytes:
+        """当前 key，LEFAC_256 变化时重载。"""
+        if self._fixed_key is not None:
+            return self._fixed_key
+        raw = os.environ.get("LEFAC_256")
+        key = self._key
+        if key is None or raw != self._key_raw:
+            with self._lock:
+                key = _load_key()
+                self._key, self._key_raw = key, raw
+        return key
+
+    def iam32(self) -> int:
+        """当前 IAM 的 32-bit 编码，IAM.txt 变化时重载。"""
+        if self._fixed_iam32 is not None:
+            return self._fixed_iam32
+        path = _iam_path()
+        iam32 = self._iam32
+        if iam32 is None or _iam_file_sig(path) != self._iam_sig:
+            with self._lock:
+                iam32 = _load_iam()
+                # _load_iam 可能覆写文件，加载之后再取签名
+                self._iam32, self._iam_sig = iam32, _iam_file_sig(path)
+        return iam32
+
+    def generate(self, app_id: int, *, sequential: bool = False,
+                 monotonic: bool = False,
+                 _time_ms: Optional[int] = None) -> bytes:
+        """同模块级 generate()，使用缓存的 key / IAM。"""
+        return generate(app_id, sequential=sequential, monotonic=monotonic,
+                        _key=self.key(), _iam32=self.iam32(), _time_ms=_time_ms)
+
+    def generate_many(self, app_id: int, n: int, *, sequential: bool = False,
+                      monotonic: bool = False,
+                      packed: bool = False, _time_ms: Optional[int] = None):
+        """同模块级 generate_many()，使用缓存的 key / IAM。"""
+        return generate_many(app_id, n, sequential=sequential, monotonic=monotonic,
+                             packed=packed, _key=self.key(), _iam32=self.iam32(),
+                             _time_ms=_time_ms)
+
+    def decode(self, uid: bytes) -> dict:
+        """同模块级 decode()，使用缓存的 key。"""
+        return decode(uid, _key=self.key())
+
+    def decode_many(self, uids, *, verify: bool = False) -> dict:
+        """同模块级 decode_many()，使用缓存的 key。"""
+        return decode_many(uids, verify=verify, _key=self.key())
+
+
+_default_generator = Generator()
+
 # ── Core: generate / decode ──────────────────────────────────────────
 
 
 def generate(app_id: int, *, sequential: bool = False,
+             monotonic: bool = False,
              _key: Optional[bytes] = None,
              _iam32: Optional[int] = None,
              _time_ms: Optional[int] = None) -> bytes:
@@ -224,6 +441,8 @@ def generate(app_id: int, *, sequential: bool = False,
     Args:
         app_id:     16-bit 应用标识 (0 ~ 65535)
         sequential: True 使用单调递增序列号，False 随机生成 (默认)
+        monotonic:  True 使用类 ULID 的单调模式: 序列号每毫秒归零，
+                    槽位用完时时间字段进位，同线程生成的 ID 严格递增
         _key/_iam32/_time_ms: 测试用覆盖参数
 
     Returns:
@@ -231,16 +450,23 @@ def generate(app_id: int, *, sequential: bool = False,
     """
     if not (0 <= app_id <= _SEQ16_MAX):
         raise ValueError(f"app_id 超出范围 [0, 65535]: {app_id}")
+    if sequential and monotonic:
+        raise ValueError("sequential 与 monotonic 不能同时开启")
 
-    key = _key if _key is not None else _load_key()
-    iam32 = _iam32 if _iam32 is not None else _load_iam()
+    key = _key if _key is not None else _default_generator.key()
+    iam32 = _iam32 if _iam32 is not None else _default_generator.iam32()
     t48 = _time_ms if _time_ms is not None else _now_ms()
 
+    if monotonic:
+        t48, seq16 = _monotonic_seq.next(t48)
+    elif sequential:
+        seq16 = _seq_counter.next()
+    else:
+        seq16 = secrets.randbelow(1 << 16)
+
     if t48 < 0 or t48 > _TIME48_MAX:
         raise OverflowError(f"时间戳超出 48-bit 范围: {t48}")
 
-    seq16 = _seq_counter.next() if sequential else secrets.randbelow(1 << 16)
-
     # ── 基础信息 (112 bits = 14 bytes) ──
     base_info = (
         app_id.to_bytes(2, "big")
@@ -253,7 +479,7 @@ def generate(app_id: int, *, sequential: bool = False,
     hmac_16 = _hmac_sha256(key, base_info)[:2]  # 前 2 bytes = 16 bits
 
     # ── obs: 混淆掩码 ──
-    obs = _hmac_sha256(key, t48.to_bytes(6, "big"))[:6]  # 前 6 bytes = 48 bits
+    obs = _obs_mask(key, t48)  # 前 6 bytes = 48 bits
 
     # ── 混淆: (IAM_32 | HMAC_16) XOR obs ──
     plain_tail = iam32.to_bytes(4, "big") + hmac_16  # 6 bytes
@@ -268,6 +494,92 @@ def generate(app_id: int, *, sequential: bool = False,
     )
 
 
+def generate_many(app_id: int, n: int, *, sequential: bool = False,
+                  monotonic: bool = False,
+                  packed: bool = False,
+                  _key: Optional[bytes] = None,
+                  _iam32: Optional[int] = None,
+                  _time_ms: Optional[int] = None):
+    """
+    批量生成 n 个 ATSIHID，逐字节等同于循环调用 generate()。
+
+    - sequential=True 时一次加锁预留 n 个连续序列号
+    - monotonic=True 时按毫秒一次加锁预留槽位，结果严格递增
+    - 随机序列号一次性取自 secrets.token_bytes(2n)
+    - obs 掩码每毫秒只取一次 (经 _obs_mask 缓存)
+
+    Args:
+        app_id:     16-bit 应用标识 (0 ~ 65535)
+        n:          生成数量
+        sequential: True 使用单调递增序列号，False 随机生成 (默认)
+        monotonic:  True 使用类 ULID 的单调模式 (见 generate)
+        packed:     True 返回 n*16 bytes 的连续 bytes，False 返回 list[bytes] (默认)
+        _key/_iam32/_time_ms: 测试用覆盖参数
+
+    Returns:
+        list[bytes] 或 bytes (packed=True)
+    """
+    if not (0 <= app_id <= _SEQ16_MAX):
+        raise ValueError(f"app_id 超出范围 [0, 65535]: {app_id}")
+    if n < 0:
+        raise ValueError(f"n 不能为负数: {n}")
+    if sequential and monotonic:
+        raise ValueError("sequential 与 monotonic 不能同时开启")
+
+    key = _key if _key is not None else _default_generator.key()
+    iam32 = _iam32 if _iam32 is not None else _default_generator.iam32()
+
+    times = None
+    if monotonic:
+        now = _time_ms if _time_ms is not None else _now_ms()
+        times = []
+        seq_parts = []
+        for t48, start, count in _monotonic_seq.take(now, n):
+            times.extend([t48] * count)
+            seq_parts.append(b"".join(s.to_bytes(2, "big") for s in range(start, start + count)))
+        seq_bytes = b"".join(seq_parts)
+    elif sequential:
+        seq_start = _seq_counter.take(n)
+        seq_bytes = b"".join(((seq_start + i) & _SEQ16_MAX).to_bytes(2, "big") for i in range(n))
+    else:
+        seq_bytes = secrets.token_bytes(2 * n)
+
+    app_bytes = app_id.to_bytes(2, "big")
+    iam_bytes = iam32.to_bytes(4, "big")
+    iam_shifted = iam32 << 16
+    tmpl = _hmac_template(key)
+
+    out = bytearray(16 * n)
+    t_prev = -1
+    head = b""
+    obs = 0
+    mac_head = tmpl.mac
+    for i in range(n):
+        if times is not None:
+            t48 = times[i]
+        else:
+            t48 = _time_ms if _time_ms is not None else _now_ms()
+        if t48 != t_prev:
+            if t48 < 0 or t48 > _TIME48_MAX:
+                raise OverflowError(f"时间戳超出 48-bit 范围: {t48}")
+            time_bytes = t48.to_bytes(6, "big")
+            obs = int.from_bytes(_obs_mask(key, t48), "big")
+            head = app_bytes + time_bytes
+            mac_head = tmpl.prefixed(head).mac
+            t_prev = t48
+
+        seq_b = seq_bytes[2 * i:2 * i + 2]
+        h = mac_head.copy()
+        h.update(seq_b + iam_bytes)
+        hmac_16 = int.from_bytes(h.digest()[:2], "big")
+        tail = ((iam_shifted | hmac_16) ^ obs).to_bytes(6, "big")
+        out[16 * i:16 * i + 16] = head + seq_b + tail
+
+    if packed:
+        return bytes(out)
+    return [bytes(out[j:j + 16]) for j in range(0, 16 * n, 16)]
+
+
 def decode(uid: bytes, *, _key: Optional[bytes] = None) -> dict:
     """
     解码 128-bit ATSIHID，返回各字段及签名校验结果。
@@ -291,7 +603,7 @@ def decode(uid: bytes, *, _key: Optional[bytes] = None) -> dict:
     if len(uid) != 16:
         raise ValueError(f"ATSIHID 必须是 16 bytes，收到 {len(uid)}")
 
-    key = _key if _key is not None else _load_key()
+    key = _key if _key is not None else _default_generator.key()
 
     app_id = int.from_bytes(uid[0:2], "big")
     t48 = int.from_bytes(uid[2:8], "big")
@@ -299,7 +611,7 @@ def decode(uid: bytes, *, _key: Optional[bytes] = None) -> dict:
     obfuscated = uid[10:16]  # 6 bytes
 
     # 还原: obs XOR
-    obs = _hmac_sha256(key, t48.to_bytes(6, "big"))[:6]
+    obs = _obs_mask(key, t48)
     plain_tail = bytes(a ^ b for a, b in zip(obfuscated, obs))
     field32 = int.from_bytes(plain_tail[0:4], "big")
     hmac_got = plain_tail[4:6]
@@ -331,9 +643,322 @@ def decode(uid: bytes, *, _key: Optional[bytes] = None) -> dict:
     }
 
 
+# ── Bulk decode (columnar) ───────────────────────────────────────────
+
+# App_16 | Time_hi16 | Time_lo32 | Seq_16 | Obf_hi32 | Obf_lo16
+_ID_STRUCT = struct.Struct(">HHIHIH")
+
+
+def _as_packed(uids) -> memoryview:
+    """list[bytes] 或连续 bytes 缓冲区 → 长度为 16 整数倍的只读 memoryview。"""
+    if isinstance(uids, (bytes, bytearray, memoryview)):
+        buf = memoryview(uids).cast("B")
+    else:
+        uids = list(uids)
+        for uid in uids:
+            if len(uid) != 16:
+                raise ValueError(f"ATSIHID 必须是 16 bytes，收到 {len(uid)}")
+        buf = memoryview(b"".join(uids))
+    if len(buf) % 16:
+        raise ValueError(f"缓冲区长度必须是 16 的整数倍，收到 {len(buf)}")
+    return buf
+
+
+def decode_many(uids, *, verify: bool = False, _key: Optional[bytes] = None) -> dict:
+    """
+    批量解码 ATSIHID，返回列式结果，便于按 app_id / 时间 / IAM 分组统计。
+
+    解码仍是纯 Python 逐行进行（非向量化）：定长字段由 struct.iter_unpack 在缓冲区上逐个解析，
+    list 输入会先 b"".join 拷贝成连续缓冲区；obs 掩码按毫秒去重，IAM 字符串经字典驻留（相同 IAM 共享同一对象）。
+
+    Args:
+        uids:   list[bytes] 或 n*16 bytes 的连续缓冲区 (bytes / bytearray / memoryview)
+        verify: True 时逐个校验 HMAC，False 时跳过 (hmac_ok 为 None)
+        _key:   测试用覆盖参数
+
+    Returns:
+        {
+            "app_id":  array('H'),
+            "time_ms": array('Q'),      # 相对于 ATSIHID 纪元的毫秒数
+            "seq":     array('H'),
+            "field32": array('L'),      # 原始 32-bit 值
+            "iam":     list[str],       # 高 2 位非 0 (IPv4) 时为 ""
+            "hmac_ok": list[bool] | None,
+        }
+    """
+    buf = _as_packed(uids)
+    key = _key if _key is not None else _default_generator.key()
+
+    app_col = array("H")
+    time_col = array("Q")
+    seq_col = array("H")
+    f32_col = array("L")
+    iam_col: list[str] = []
+    ok_col: Optional[list[bool]] = [] if verify else None
+
+    obs_by_time: dict[int, int] = {}
+    iam_by_f32: dict[int, str] = {}
+    sig = _hmac_template(key).digest
+
+    for i, (app_id, t_hi, t_lo, seq16, o_hi, o_lo) in enumerate(_ID_STRUCT.iter_unpack(buf)):
+        t48 = (t_hi << 32) | t_lo
+        obs = obs_by_time.get(t48)
+        if obs is None:
+            obs = obs_by_time[t48] = int.from_bytes(_obs_mask(key, t48), "big")
+        plain = ((o_hi << 16) | o_lo) ^ obs
+        field32 = plain >> 16
+
+        iam = iam_by_f32.get(field32)
+        if iam is None:
+            iam = iam_by_f32[field32] = decode_iam_32(field32) if (field32 >> 30) == 0 else ""
+
+        app_col.append(app_id)
+        time_col.append(t48)
+        seq_col.append(seq16)
+        f32_col.append(field32)
+        iam_col.append(iam)
+
+        if ok_col is not None:
+            base_info = bytes(buf[16 * i:16 * i + 10]) + field32.to_bytes(4, "big")
+            hmac_expected = sig(base_info)[:2]
+            ok_col.append(hmac.compare_digest((plain & 0xFFFF).to_bytes(2, "big"), hmac_expected))
+
+    return {
+        "app_id": app_col,
+        "time_ms": time_col,
+        "seq": seq_col,
+        "field32": f32_col,
+        "iam": iam_col,
+        "hmac_ok": ok_col,
+    }
+
+
+# ── ID pool ──────────────────────────────────────────────────────────
+
+
+class IdPool:
+    """预生成 ATSIHID 的池子，后台补货，请求路径上只做一次 deque.popleft()。
+
+    - take() 为 O(1)，不加锁（deque 的 append / popleft 本身线程安全）
+    - 余量低于 low_water 时唤醒后台线程，用 generate_many() 一次补满到 size
+    - 时间戳早于当前时间 max_staleness_ms 以上的 ID 会被丢弃，不会发出；
+      因此取出的 ID 与 "此刻现生成" 的 ID 在时间上最多相差 max_staleness_ms
+    - 池子取空时同步调用 generate() 兜底，并计入 underflows
+
+    用法：
+        pool = IdPool(1, size=4096, low_water=1024)
+        uid = pool.take()
+        pool.close()
+
+    asyncio 应用可用 background=False 并自行调度 refill_async()：
+        pool = IdPool(1, background=False)
+        task = asyncio.create_task(pool.refill_async())
+    """
+
+    def __init__(self, app_id: int, size: int = 4096, low_water: Optional[int] = None, *,
+                 sequential: bool = False, max_staleness_ms: int = 1000,
+                 background: bool = True,
+                 _key: Optional[bytes] = None, _iam32: Optional[int] = None) -> None:
+        if not (0 <= app_id <= _SEQ16_MAX):
+            raise ValueError(f"app_id 超出范围 [0, 65535]: {app_id}")
+        if size <= 0:
+            raise ValueError(f"size 必须 > 0: {size}")
+        self.app_id = app_id
+        self.size = size
+        self.low_water = size // 4 if low_water is None else low_water
+        if not (0 <= self.low_water < size):
+            raise ValueError(f"low_water 必须在 [0, size) 内: {self.low_water}")
+        self.sequential = sequential
+        self.max_staleness_ms = max_staleness_ms
+
+        if _key is None and _iam32 is None:
+            self._gen = _default_generator
+        else:
+            self._gen = Generator(key=_key, iam32=_iam32)
+
+        self._buf: collections.deque[bytes] = collections.deque()
+        self._refill_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+
+        self._started = time.monotonic()
+        self._refills = 0
+        self._refilled_ids = 0
+        self._refill_seconds = 0.0
+        self._underflows = 0
+        self._stale_dropped = 0
+        self._taken = 0
+
+        self.refill()
+        self._thread: Optional[threading.Thread] = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name=f"IdPool-{app_id}", daemon=True)
+            self._thread.start()
+
+    # ── 请求路径 ──
+
+    def take(self) -> bytes:
+        """取一个 ID。池子为空时同步生成。"""
+        buf = self._buf
+        while True:
+            try:
+                uid = buf.popleft()
+            except IndexError:
+                self._underflows += 1
+                self._wake.set()
+                self._taken += 1
+                return self._gen.generate(self.app_id, sequential=self.sequential)
+            if _now_ms() - int.from_bytes(uid[2:8], "big") > self.max_staleness_ms:
+                self._stale_dropped += 1
+                continue
+            if len(buf) < self.low_water:
+                self._wake.set()
+            self._taken += 1
+            return uid
+
+    # ── 补货 ──
+
+    def _drop_stale(self) -> None:
+        """从队头丢弃过期 ID（队列按生成时间有序，过期的都在队头）。"""
+        buf = self._buf
+        deadline = _now_ms() - self.max_staleness_ms
+        while True:
+            try:
+                uid = buf[0]
+            except IndexError:
+                return
+            if int.from_bytes(uid[2:8], "big") >= deadline:
+                return
+            try:
+                buf.popleft()
+            except IndexError:
+                return
+            self._stale_dropped += 1
+
+    def refill(self) -> int:
+        """丢弃过期 ID 并补满到 size，返回新生成的数量。"""
+        with self._refill_lock:
+            self._drop_stale()
+            n = self.size - len(self._buf)
+            if n <= 0:
+                return 0
+            t0 = time.perf_counter()
+            self._buf.extend(self._gen.generate_many(self.app_id, n, sequential=self.sequential))
+            self._refill_seconds += time.perf_counter() - t0
+            self._refills += 1
+            self._refilled_ids += n
+            return n
+
+    def _needs_refill(self) -> bool:
+        buf = self._buf
+        if len(buf) < self.low_water:
+            return True
+        try:
+            oldest = int.from_bytes(buf[0][2:8], "big")
+        except IndexError:
+            return True
+        # 队头过了一半的有效期就提前换货，避免 take() 时大量丢弃
+        return _now_ms() - oldest > self.max_staleness_ms // 2
+
+    def _run(self) -> None:
+        interval = max(self.max_staleness_ms / 4000, 0.001)
+        while not self._closed.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            if self._closed.is_set():
+                break
+            if self._needs_refill():
+                self.refill()
+
+    async def refill_async(self) -> None:
+        """asyncio 版后台补货循环，生成放在线程池里执行，不阻塞事件循环。close() 后退出。"""
+        import asyncio
+
+        # 协程无法等待 take() 触发的 threading.Event，改为短间隔轮询余量
+        interval = min(max(self.max_staleness_ms / 4000, 0.001), 0.01)
+        while not self._closed.is_set():
+            if self._needs_refill():
+                await asyncio.to_thread(self.refill)
+            else:
+                await asyncio.sleep(interval)
+
+    # ── 生命周期 / 统计 ──
+
+    def close(self) -> None:
+        """停止后台补货。"""
+        self._closed.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "IdPool":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def stats(self) -> dict:
+        """运行统计（计数在多线程下为近似值）。
+
+        Returns:
+            {
+                "available":     int,    # 当前池中 ID 数
+                "taken":         int,
+                "refills":       int,    # 补货次数
+                "refilled_ids":  int,
+                "refill_rate":   float,  # 补货时的生成速度 (IDs/sec)
+                "underflows":    int,    # 池子为空、同步生成的次数
+                "stale_dropped": int,    # 因超过 max_staleness_ms 丢弃的 ID 数
+                "uptime":        float,  # 秒
+            }
+        """
+        return {
+            "available": len(self._buf),
+            "taken": self._taken,
+            "refills": self._refills,
+            "refilled_ids": self._refilled_ids,
+            "refill_rate": self._refilled_ids / self._refill_seconds if self._refill_seconds else 0.0,
+            "underflows": self._underflows,
+            "stale_dropped": self._stale_dropped,
+            "uptime": time.monotonic() - self._started,
+        }
+
+
 # ── Base64 (custom alphabet) ─────────────────────────────────────────
 
 
+# 128 bits 左补 4 个 0 bit 成 132 bits = 11 组 12-bit，每组查表得 2 个字符
+_B64_PAIRS = [a + b for a in _B64_ALPHABET for b in _B64_ALPHABET]  # 4096 项
+_B64_PAIR_SHIFTS = tuple(range(120, -1, -12))
+# 每个合法字符 → 2 位八进制数字 (6 bits)，整串翻译后用 int(..., 8) 一次解析
+_B64_TO_OCTAL = str.maketrans({c: f"{i:02o}" for i, c in enumerate(_B64_ALPHABET)})
+
+
+def _int_to_b64(n: int) -> str:
+    """128-bit 整数 → 22-char base64 (查表，无范围检查)。"""
+    pairs = _B64_PAIRS
+    return "".join([pairs[(n >> sh) & 0xFFF] for sh in _B64_PAIR_SHIFTS])
+
+
+def _b64_to_int(s: str) -> int:
+    """22-char base64 → 128-bit 整数。
+
+    合法字符各翻译为 2 位八进制数字，非法字符原样保留，
+    因此翻译后长度 == 2 * 22 当且仅当全部字符合法。
+    """
+    if len(s) != _B64_LEN:
+        raise ValueError(f"base64 字符串必须是 {_B64_LEN} 字符，收到 {len(s)}")
+    octal = s.translate(_B64_TO_OCTAL)
+    if len(octal) != 2 * _B64_LEN:
+        bad = next(ch for ch in s if ch not in _B64_MAP)
+        raise ValueError(f"非法 base64 字符: {bad!r}")
+    n = int(octal, 8)
+    if n >> 128:
+        raise ValueError(f"base64 字符串超出 128-bit 范围: {s!r}")
+    return n
+
+
 def to_base64(uid: bytes) -> str:
     """128-bit ATSIHID → 22-char base64 字符串 (自定义 ASCII 有序字母表)。
 
@@ -341,27 +966,32 @@ def to_base64(uid: bytes) -> str:
     """
     if len(uid) != 16:
         raise ValueError(f"ATSIHID 必须是 16 bytes，收到 {len(uid)}")
-
-    n = int.from_bytes(uid, "big")
-    chars: list[str] = []
-    for _ in range(_B64_LEN):
-        n, r = divmod(n, 64)
-        chars.append(_B64_ALPHABET[r])
-    return "".join(reversed(chars))
+    return _int_to_b64(int.from_bytes(uid, "big"))
 
 
 def from_base64(s: str) -> bytes:
     """22-char base64 字符串 → 128-bit ATSIHID (16 bytes)。"""
-    if len(s) != _B64_LEN:
-        raise ValueError(f"base64 字符串必须是 {_B64_LEN} 字符，收到 {len(s)}")
+    return _b64_to_int(s).to_bytes(16, "big")
 
-    n = 0
-    for ch in s:
-        if ch not in _B64_MAP:
-            raise ValueError(f"非法 base64 字符: {ch!r}")
-        n = n * 64 + _B64_MAP[ch]
 
-    return n.to_bytes(16, "big")
+def to_base64_many(uids) -> list[str]:
+    """批量 to_base64()。uids 为 list[bytes] 或 n*16 bytes 的连续缓冲区。"""
+    buf = _as_packed(uids)
+    to_b64 = _int_to_b64
+    from_bytes = int.from_bytes
+    return [to_b64(from_bytes(buf[i:i + 16], "big")) for i in range(0, len(buf), 16)]
+
+
+def from_base64_many(strs, *, packed: bool = False):
+    """批量 from_base64()。
+
+    Args:
+        strs:   22-char base64 字符串的可迭代对象
+        packed: True 返回 n*16 bytes 的连续 bytes，False 返回 list[bytes] (默认)
+    """
+    to_int = _b64_to_int
+    uids = [to_int(s).to_bytes(16, "big") for s in strs]
+    return b"".join(uids) if packed else uids
 
 
 # ── Sorting ──────────────────────────────────────────────────────────
@@ -377,42 +1007,794 @@ def sort(uids: list[bytes], *, reverse: bool = False) -> list[bytes]:
     return sorted(uids, key=sort_key, reverse=reverse)
 
 
+# ── Range query ──────────────────────────────────────────────────────
+
+
+def _unix_to_t48(unix: float, *, upper: bool) -> int:
+    """Unix 秒 → 相对纪元的毫秒，裁剪到 48-bit 范围。
+
+    upper=False 向上取整（下界不含早于 unix 的毫秒），upper=True 向下取整。
+    先舍入到微秒再按整数取整，避免浮点误差让恰好落在毫秒边界上的时间偏出 1 ms。
+    """
+    us = round(unix * 1_000_000)
+    t48 = (us // 1000 if upper else -(-us // 1000)) - _EPOCH_MS
+    return min(max(t48, 0), _TIME48_MAX)
+
+
+def range_bounds(app_id: int, start_unix: float, end_unix: float) -> dict:
+    """计算 "app_id 在 [start_unix, end_unix] 内的全部 ID" 的键范围（两端均包含）。
+
+    ATSIHID 按 App → Time → Seq 字节序有序，键存储只需一次范围扫描 min <= key <= max。
+
+    注意：字母表中 '_' 的 ASCII 码小于小写字母，base64 字符串序与字节序并非处处一致，
+    以 base64 字符串为键的存储用 min_base64 / max_base64 做范围扫描时可能漏掉边界附近的 ID，
+    优先使用 16-byte 键。
+
+    Returns:
+        {"min": bytes, "max": bytes, "min_base64": str, "max_base64": str}
+    """
+    if not (0 <= app_id <= _SEQ16_MAX):
+        raise ValueError(f"app_id 超出范围 [0, 65535]: {app_id}")
+    if end_unix < start_unix:
+        raise ValueError(f"end_unix 早于 start_unix: {end_unix} < {start_unix}")
+
+    t_lo = _unix_to_t48(start_unix, upper=False)
+    t_hi = _unix_to_t48(end_unix, upper=True)
+    lo = (app_id << 112) | (t_lo << 64)
+    hi = (app_id << 112) | (t_hi << 64) | ((1 << 64) - 1)
+    return {
+        "min": lo.to_bytes(16, "big"),
+        "max": hi.to_bytes(16, "big"),
+        "min_base64": _int_to_b64(lo),
+        "max_base64": _int_to_b64(hi),
+    }
+
+
+class _PackedView:
+    """把 n*16 bytes 缓冲区包装成只读序列，供 bisect 直接二分。"""
+
+    __slots__ = ("buf",)
+
+    def __init__(self, buf: bytes) -> None:
+        self.buf = buf
+
+    def __len__(self) -> int:
+        return len(self.buf) // 16
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.buf[16 * i:16 * i + 16]
+
+
+class SortedIdIndex:
+    """内存中的有序 ATSIHID 索引，基于连续 bytes 缓冲区 + bisect。
+
+    范围、按 app 前缀、最近时间查询均为 O(log n)（加上结果数量），无需 decode()。
+
+    用法：
+        idx = SortedIdIndex(uids)
+        idx.range(1, start_unix, end_unix)
+        idx.by_app(1)
+        idx.nearest(1, unix)
+    """
+
+    def __init__(self, uids) -> None:
+        buf = bytes(_as_packed(uids))
+        view = _PackedView(buf)
+        items = [view[i] for i in range(len(view))]
+        if any(items[i] > items[i + 1] for i in range(len(items) - 1)):
+            items.sort()
+            buf = b"".join(items)
+        self._buf = buf
+        self._view = _PackedView(buf)
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def __getitem__(self, i: int) -> bytes:
+        if i < 0:
+            i += len(self)
+        if not (0 <= i < len(self)):
+            raise IndexError("SortedIdIndex 下标越界")
+        return self._view[i]
+
+    def __iter__(self):
+        view = self._view
+        return (view[i] for i in range(len(view)))
+
+    @property
+    def packed(self) -> bytes:
+        """有序的 n*16 bytes 缓冲区。"""
+        return self._buf
+
+    def _slice(self, lo_key: bytes, hi_key: bytes) -> list[bytes]:
+        """lo_key <= uid <= hi_key 的全部 ID。"""
+        view = self._view
+        lo = bisect.bisect_left(view, lo_key)
+        hi = bisect.bisect_right(view, hi_key, lo)
+        buf = self._buf
+        return [buf[16 * i:16 * i + 16] for i in range(lo, hi)]
+
+    def range(self, app_id: int, start_unix: float, end_unix: float) -> list[bytes]:
+        """app_id 在 [start_unix, end_unix] 内的全部 ID（有序）。"""
+        bounds = range_bounds(app_id, start_unix, end_unix)
+        return self._slice(bounds["min"], bounds["max"])
+
+    def by_app(self, app_id: int) -> list[bytes]:
+        """app_id 的全部 ID（有序）。"""
+        if not (0 <= app_id <= _SEQ16_MAX):
+            raise ValueError(f"app_id 超出范围 [0, 65535]: {app_id}")
+        prefix = app_id.to_bytes(2, "big")
+        return self._slice(prefix + b"\x00" * 14, prefix + b"\xff" * 14)
+
+    def nearest(self, app_id: int, unix: float) -> Optional[bytes]:
+        """app_id 下时间最接近 unix 的 ID；相等时取较早者，无该 app 的 ID 时返回 None。"""
+        if not (0 <= app_id <= _SEQ16_MAX):
+            raise ValueError(f"app_id 超出范围 [0, 65535]: {app_id}")
+        view = self._view
+        prefix = app_id.to_bytes(2, "big")
+        app_lo = bisect.bisect_left(view, prefix + b"\x00" * 14)
+        app_hi = bisect.bisect_right(view, prefix + b"\xff" * 14, app_lo)
+        if app_lo == app_hi:
+            return None
+
+        target_ms = unix * 1000 - _EPOCH_MS
+        t48 = min(max(math.floor(target_ms), 0), _TIME48_MAX)
+        pos = bisect.bisect_left(view, prefix + t48.to_bytes(6, "big") + b"\x00" * 8, app_lo, app_hi)
+        best: Optional[bytes] = None
+        best_dist = 0.0
+        for i in (pos - 1, pos):
+            if app_lo <= i < app_hi:
+                uid = view[i]
+                dist = abs(int.from_bytes(uid[2:8], "big") - target_ms)
+                if best is None or dist < best_dist:
+                    best, best_dist = uid, dist
+        return best
+
+
+# ── Compact packing ──────────────────────────────────────────────────
+#
+# pack_ids() 格式 (version 1)：
+#   magic "ATSP" | version (1 byte) | varint 总数
+#   之后为若干 app 段 (输入中连续相同 app_id 的一段)：
+#     varint app_id | varint 段内 ID 数
+#     每个 ID：
+#       varint zigzag(Δtime)           段首 Δ 相对 0，即绝对时间
+#       Δtime == 0: varint zigzag(Δseq)  同一毫秒内 seq 的差值
+#       Δtime != 0: seq 2 bytes 原值
+#       6 bytes 混淆尾部原样保存
+# 按 App → Time 有序的输入压缩效果最好，但任意顺序都能正确往返。
+
+_PACK_MAGIC = b"ATSP"
+_PACK_VERSION = 1
+
+
+def _put_varint(out: bytearray, n: int) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(buf, pos: int) -> tuple[int, int]:
+    n = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _zigzag(n: int) -> int:
+    return (n << 1) if n >= 0 else ((-n << 1) - 1)
+
+
+def _unzigzag(n: int) -> int:
+    return (n >> 1) if not (n & 1) else -((n + 1) >> 1)
+
+
+def pack_ids(uids) -> bytes:
+    """把 ATSIHID 列表打包为紧凑的列式二进制格式。
+
+    app_id 按连续段存储，时间与 seq 做差分 varint 编码，48-bit 混淆尾部原样保存。
+    已排序的输入通常每个 ID 约 8~9 bytes（base64 文本为 22~23 bytes）。
+
+    Args:
+        uids: list[bytes] 或 n*16 bytes 的连续缓冲区；顺序原样保留
+    """
+    buf = _as_packed(uids)
+    n = len(buf) // 16
+    out = bytearray(_PACK_MAGIC)
+    out.append(_PACK_VERSION)
+    _put_varint(out, n)
+
+    rows = list(_ID_STRUCT.iter_unpack(buf))
+    i = 0
+    while i < n:
+        app_id = rows[i][0]
+        j = i
+        while j < n and rows[j][0] == app_id:
+            j += 1
+        _put_varint(out, app_id)
+        _put_varint(out, j - i)
+
+        prev_t = 0
+        prev_seq = 0
+        for k in range(i, j):
+            _, t_hi, t_lo, seq16, _, _ = rows[k]
+            t48 = (t_hi << 32) | t_lo
+            dt = t48 - prev_t
+            _put_varint(out, _zigzag(dt))
+            if dt == 0:
+                _put_varint(out, _zigzag(seq16 - prev_seq))
+            else:
+                out += seq16.to_bytes(2, "big")
+            out += buf[16 * k + 10:16 * k + 16]
+            prev_t, prev_seq = t48, seq16
+        i = j
+    return bytes(out)
+
+
+def iter_packed_ids(buf):
+    """流式读取 pack_ids() 的输出，逐个产出 16-byte ID，不构建完整列表。"""
+    buf = memoryview(buf).cast("B")
+    if bytes(buf[:4]) != _PACK_MAGIC:
+        raise ValueError("不是 pack_ids() 格式的数据")
+    if buf[4] != _PACK_VERSION:
+        raise ValueError(f"不支持的 pack_ids() 版本: {buf[4]}")
+    total, pos = _get_varint(buf, 5)
+
+    try:
+        yield from _iter_packed_body(buf, pos, total)
+    except IndexError:
+        raise ValueError("pack_ids() 数据被截断") from None
+
+
+def _iter_packed_body(buf: memoryview, pos: int, total: int):
+    end = len(buf)
+    produced = 0
+    while produced < total:
+        app_id, pos = _get_varint(buf, pos)
+        count, pos = _get_varint(buf, pos)
+        app_bytes = app_id.to_bytes(2, "big")
+        t48 = 0
+        seq16 = 0
+        for _ in range(count):
+            zdt, pos = _get_varint(buf, pos)
+            dt = _unzigzag(zdt)
+            t48 += dt
+            if dt == 0:
+                zds, pos = _get_varint(buf, pos)
+                seq16 += _unzigzag(zds)
+                seq_bytes = seq16.to_bytes(2, "big")
+            else:
+                seq_bytes = bytes(buf[pos:pos + 2])
+                seq16 = int.from_bytes(seq_bytes, "big")
+                pos += 2
+            if pos + 6 > end:
+                raise IndexError
+            yield app_bytes + t48.to_bytes(6, "big") + seq_bytes + bytes(buf[pos:pos + 6])
+            pos += 6
+        produced += count
+    if pos != end:
+        raise ValueError(f"pack_ids() 数据末尾有 {end - pos} bytes 多余内容")
+
+
+def unpack_ids(buf, *, packed: bool = False):
+    """pack_ids() 的逆操作。packed=True 返回 n*16 bytes 的连续 bytes，否则返回 list[bytes]。"""
+    uids = list(iter_packed_ids(buf))
+    return b"".join(uids) if packed else uids
+
+
 # ── Vanity search ───────────────────────────────────────────────────
 
 
-def _build_substring_table(needle: str, case_sensitive: bool) -> list[list[str]]:
-    """预计算 needle 的所有子串，按长度分组 (index 0 = length 1)。"""
-    if not case_sensitive:
-        needle = needle.lower()
-    table: list[list[str]] = []
-    for length in range(1, len(needle) + 1):
-        subs = []
-        for start in range(len(needle) - length + 1):
-            subs.append(needle[start:start + length])
-        table.append(subs)
-    return table
+# 按 ASCII 反转字符：翻译后（等长）字符串的字典序与原串相反，用于 heap 中 "base64 越大越差"。
+# 注意 '_' (0x5F) 的 ASCII 码小于小写字母，需按 ASCII 而非字母表下标排序。
+_B64_ASCII_SORTED = "".join(sorted(_B64_ALPHABET))
+_B64_REVERSE = str.maketrans(_B64_ASCII_SORTED, _B64_ASCII_SORTED[::-1])
+
 
+# base64 第 k 个字符 (k >= 1) 对应 uid 的 bit[6*(21-k) .. 6*(21-k)+5]，第 0 个字符只有最高 2 bits。
+# 按 App_16 | Time_48 | Seq_16 | Obfuscated_48 布局：
+#   0..10  只由 app + time 决定（每毫秒固定）
+#   11     高 2 bits 为 time 最低 2 bits，低 4 bits 为 seq 高 4 bits
+#   12, 13 seq 的中 6 bits、低 6 bits
+#   14..18 被 obs 掩码后的 IAM（每毫秒固定）
+#   19     高 2 bits 为掩码后 IAM 的最低 2 bits，低 4 bits 来自 HMAC
+#   20, 21 只由 HMAC 决定
+_VANITY_SEQ_POS = (11, 12, 13)
+_VANITY_HMAC_POS = 19
 
-def _fuzzy_score_fast(haystack: str, sub_table: list[list[str]], min_score: int) -> int:
-    """返回 needle 在 haystack 中最长连续匹配子串的长度。
 
-    只检查长度 > min_score 的子串（低于 min_score 的不值得入围）。
+class _VanityAnalyzer:
+    """vanity 精确搜索的按位置剪枝分析器。
+
+    对 target 的每个可能落点，先用每毫秒固定的字符排除整个毫秒，
+    再把落在第 11~13 位的字符换算成 seq 取值集合，只对剩下的 seq 计算 HMAC。
     """
-    for length_idx in range(len(sub_table) - 1, min_score - 1, -1):
-        for sub in sub_table[length_idx]:
-            if sub in haystack:
-                return length_idx + 1  # length = index + 1
-    return 0
 
+    def __init__(self, target: str, case_sensitive: bool) -> None:
+        if not case_sensitive:
+            target = target.lower()
+        # allowed[i]: target 第 i 个字符可以对应的字母表取值
+        self.allowed: list[frozenset[int]] = []
+        for ch in target:
+            vals = frozenset(
+                v for v, c in enumerate(_B64_ALPHABET)
+                if (c if case_sensitive else c.lower()) == ch
+            )
+            self.allowed.append(vals)
+        self.placements = range(_B64_LEN - len(target) + 1)
+
+    @staticmethod
+    def _char_at(base: int, k: int) -> int:
+        return base >> 126 if k == 0 else (base >> (6 * (_B64_LEN - 1 - k))) & 0x3F
+
+    def candidate_seqs(self, base: int) -> list[int]:
+        """给定 seq = 0、HMAC = 0 时的 uid 整数，返回仍可能命中的 seq（升序）。"""
+        chars = [self._char_at(base, k) for k in range(_B64_LEN)]
+        hi_time = chars[11] & 0x30
+        hi_hmac = chars[_VANITY_HMAC_POS] & 0x30
+        full = range(1 << 16)
+        seqs: set[int] = set()
+        for p in self.placements:
+            hi4 = range(16)
+            mid6 = lo6 = range(64)
+            ok = True
+            for i, vals in enumerate(self.allowed):
+                k = p + i
+                if k == 11:
+                    hi4 = sorted({v & 0x0F for v in vals if v & 0x30 == hi_time})
+                elif k == 12:
+                    mid6 = sorted(vals)
+                elif k == 13:
+                    lo6 = sorted(vals)
+                elif k == _VANITY_HMAC_POS:
+                    ok = any(v & 0x30 == hi_hmac for v in vals)
+                elif k < _VANITY_HMAC_POS:
+                    ok = chars[k] in vals
+                if not ok or not hi4 or not mid6 or not lo6:
+                    ok = False
+                    break
+            if not ok:
+                continue
+            if len(hi4) == 16 and len(mid6) == 64 and len(lo6) == 64:
+                return list(full)
+            seqs.update((h << 12) | (m << 6) | lo for h in hi4 for m in mid6 for lo in lo6)
+        return sorted(seqs)
+
+
+class _VanityTimeout(Exception):
+    """_vanity_candidates 到达 wall_deadline。"""
+
+
+def _vanity_candidates(
+    app_id: int,
+    key: bytes,
+    iam32: int,
+    t_start: int,
+    ms_lo: int,
+    ms_hi: int,
+    wall_deadline: Optional[float],
+    analyzers: Optional[list["_VanityAnalyzer"]] = None,
+):
+    """按扫描顺序 (毫秒 → seq) 逐个产出候选 (base64, uid_int)。
+
+    analyzers 非空时只产出其中任一分析器认为可能精确命中的 seq。
+    到达 wall_deadline (time.time() 时间戳) 时抛出 _VanityTimeout。
+    """
+    # 预计算常量
+    app_hi = app_id << 112  # app_id 在 128-bit 中的位置
+    app_bytes = app_id.to_bytes(2, "big")
+    iam_bytes = iam32.to_bytes(4, "big")
+    # 签名输入的变化部分 seq16 + IAM，全部 65536 个预先拼好
+    sig_suffixes = [seq16.to_bytes(2, "big") + iam_bytes for seq16 in range(1 << 16)]
+    tmpl = _hmac_template(key)
+    all_seqs = range(1 << 16)
+
+    _to_b64 = _int_to_b64
+    _now = time.time
+
+    for ms_offset in range(ms_lo, ms_hi):
+        # 剪枝后大部分毫秒没有候选 seq，内层循环不会执行，这里每 256 毫秒也检查一次墙钟时间
+        if wall_deadline and ((ms_offset - ms_lo) & 0xFF) == 0 and _now() >= wall_deadline:
+            raise _VanityTimeout
+        t48 = t_start + ms_offset
+        if t48 < 0 or t48 > _TIME48_MAX:
+            continue
+
+        time_bytes = t48.to_bytes(6, "big")
+        obs = tmpl.digest(time_bytes)[:6]
+        obs_iam = bytes(a ^ b for a, b in zip(iam_bytes, obs[:4]))
+        obs_iam_int = int.from_bytes(obs_iam, "big")
+        obs_tail_0 = obs[4]
+        obs_tail_1 = obs[5]
 
-def _int_to_base64(n: int) -> str:
-    """将 128-bit 整数转为 22-char base64 字符串 (内联优化版)。"""
-    alph = _B64_ALPHABET
-    chars = []
-    for _ in range(_B64_LEN):
-        chars.append(alph[n & 0x3F])
-        n >>= 6
-    return "".join(reversed(chars))
+        # uid 高 80 bits 中，app + time 部分是常量
+        prefix = app_hi | (t48 << 64)
+        # masked_iam 在 uid 的 bit[16..48] 区间
+        masked_iam_shifted = obs_iam_int << 16
+
+        if not analyzers:
+            seqs = all_seqs
+        elif len(analyzers) == 1:
+            seqs = analyzers[0].candidate_seqs(prefix | masked_iam_shifted)
+        else:
+            seqs = sorted(set().union(*(a.candidate_seqs(prefix | masked_iam_shifted) for a in analyzers)))
+
+        # 签名输入的固定前缀 app + time 预先 update 进去
+        mac_ms = tmpl.prefixed(app_bytes + time_bytes).mac
+
+        for n_checked, seq16 in enumerate(seqs):
+            # 每 4096 次检查一次墙钟时间
+            if wall_deadline and (n_checked & 0xFFF) == 0 and _now() >= wall_deadline:
+                raise _VanityTimeout
+
+            h = mac_ms.copy()
+            h.update(sig_suffixes[seq16])
+            hmac_16 = h.digest()
+            xored_hmac = (hmac_16[0] ^ obs_tail_0) << 8 | (hmac_16[1] ^ obs_tail_1)
+
+            uid_int = prefix | (seq16 << 48) | masked_iam_shifted | xored_hmac
+            yield _to_b64(uid_int), uid_int
+
+
+class _VanityAutomaton:
+    """target 的 Aho-Corasick 自动机，建在全部 target 的全部子串上。
+
+    对 haystack 走一遍即可得到每个 target 在其中的最长连续匹配子串长度 (score)，
+    score == len(target) 即精确命中。vanity() 与 vanity_many() 共用（vanity() 只有一个 target）。
+    """
+
+    def __init__(self, targets: list[str]) -> None:
+        goto: list[dict[str, int]] = [{}]
+        depth = [0]
+        mask = [0]  # 节点对应字符串是哪些 target 的子串 (bitmask)
+        for t_idx, t in enumerate(targets):
+            for start in range(len(t)):
+                node = 0
+                for ch in t[start:]:
+                    nxt = goto[node].get(ch)
+                    if nxt is None:
+                        nxt = len(goto)
+                        goto[node][ch] = nxt
+                        goto.append({})
+                        depth.append(depth[node] + 1)
+                        mask.append(0)
+                    node = nxt
+                    mask[node] |= 1 << t_idx
+
+        n_targets = len(targets)
+        fail = [0] * len(goto)
+        # delta: 完整转移表（只存非根目标），best[node][i]: 以 node 结尾、且是 target i 子串的最长后缀长度
+        delta: list[dict[str, int]] = [dict(goto[0])] + [{} for _ in range(len(goto) - 1)]
+        best: list[tuple[int, ...]] = [(0,) * n_targets] * len(goto)
+        queue = list(goto[0].values())
+        for node in queue:  # BFS，queue 边遍历边追加
+            f = fail[node]
+            best[node] = tuple(
+                depth[node] if (mask[node] >> i) & 1 else best[f][i] for i in range(n_targets)
+            )
+            trans = dict(delta[f])
+            for ch, child in goto[node].items():
+                trans[ch] = child
+                fail[child] = delta[f].get(ch, 0)
+                queue.append(child)
+            delta[node] = trans
+
+        self.targets = targets
+        self.delta = delta
+        self.best = best
+        self.top = [max(b) if b else 0 for b in best]
+
+    def max_score(self, haystack: str) -> int:
+        """所有 target 中最高的 score（快速预筛）。"""
+        delta = self.delta
+        top = self.top
+        state = 0
+        m = 0
+        for ch in haystack:
+            state = delta[state].get(ch, 0)
+            if top[state] > m:
+                m = top[state]
+        return m
+
+    def scores(self, haystack: str) -> list[int]:
+        """每个 target 的 score。"""
+        delta = self.delta
+        best = self.best
+        state = 0
+        res = [0] * len(self.targets)
+        for ch in haystack:
+            state = delta[state].get(ch, 0)
+            if state:
+                res = [a if a > b else b for a, b in zip(res, best[state])]
+        return res
+
+
+def _vanity_many_scan(
+    app_id: int,
+    key: bytes,
+    iam32: int,
+    t_start: int,
+    ms_lo: int,
+    ms_hi: int,
+    targets: list[str],
+    regexes: list[str],
+    case_sensitive: bool,
+    top_n: int,
+    wall_deadline: Optional[float],
+    prune: bool = False,
+) -> tuple[list[list[tuple[str, int]]], list[list[tuple[int, str, int]]], bool]:
+    """扫描毫秒偏移 [ms_lo, ms_hi) 内全部 seq，一次匹配全部 target / 正则；vanity() 与 vanity_many() 的串行与并行模式共用。
+
+    prune=True（且没有正则）时经 _VanityAnalyzer 只扫描可能精确命中的 seq，不收集模糊候选。
+    正则只收集精确命中，没有模糊候选。
+
+    Returns:
+        (exact, fuzzy_heap, timed_out)，前两项按 targets + regexes 顺序分组
+        exact:      每组按扫描顺序排列的前 top_n 个精确命中 [(base64, uid_int)]
+        fuzzy_heap: 每组一个最小堆 [(score, reversed_base64, uid_int)]，
+                    保留按 (-score, base64) 排序的前 top_n 个模糊候选
+        timed_out:  是否因 wall_deadline (time.time() 时间戳) 提前结束
+    """
+    n_targets = len(targets)
+    folded = targets if case_sensitive else [t.lower() for t in targets]
+    automaton = _VanityAutomaton(folded) if targets else None
+    flags = 0 if case_sensitive else re.IGNORECASE
+    compiled = [re.compile(r, flags) for r in regexes]
+    lengths = [len(t) for t in folded]
+    n_groups = n_targets + len(compiled)
+
+    exact: list[list[tuple[str, int]]] = [[] for _ in range(n_groups)]
+    fuzzy: list[list[tuple[int, str, int]]] = [[] for _ in range(n_groups)]
+    # 各 target 模糊候选的入围门槛：堆满之前为 1，之后为堆顶 score
+    thresholds = [1] * n_targets
+    pending = n_groups  # 尚未凑满 top_n 精确命中的组数
+
+    # 正则无法做位置分析，只要有正则就不剪枝
+    analyzers = [_VanityAnalyzer(t, case_sensitive) for t in targets] if prune and not regexes else None
+    collect_fuzzy = not prune
+    _push = heapq.heappush
+    _pushpop = heapq.heappushpop
+    rev = _B64_REVERSE
+
+    candidates = _vanity_candidates(app_id, key, iam32, t_start, ms_lo, ms_hi, wall_deadline, analyzers)
+    try:
+        for b64, uid_int in candidates:
+            haystack = b64 if case_sensitive else b64.lower()
+            if automaton is not None:
+                m = automaton.max_score(haystack)
+                if m and (m >= min(thresholds) if collect_fuzzy else m >= min(lengths)):
+                    for i, score in enumerate(automaton.scores(haystack)):
+                        if score == lengths[i]:
+                            if len(exact[i]) < top_n:
+                                exact[i].append((b64, uid_int))
+                                if len(exact[i]) == top_n:
+                                    pending -= 1
+                        elif collect_fuzzy and score >= thresholds[i]:
+                            heap = fuzzy[i]
+                            entry = (score, b64.translate(rev), uid_int)
+                            if len(heap) < top_n:
+                                _push(heap, entry)
+                            elif entry > heap[0]:
+                                _pushpop(heap, entry)
+                            if len(heap) == top_n:
+                                thresholds[i] = heap[0][0]
+            for j, rx in enumerate(compiled, n_targets):
+                if len(exact[j]) < top_n and rx.search(b64):
+                    exact[j].append((b64, uid_int))
+                    if len(exact[j]) == top_n:
+                        pending -= 1
+            if pending == 0:
+                break
+    except _VanityTimeout:
+        return exact, fuzzy, True
+    return exact, fuzzy, False
+
+
+def _vanity_results(
+    exact: list[tuple[str, int]], fuzzy: list[tuple[int, str, int]],
+    target_len: int, top_n: int,
+) -> list[dict]:
+    """把单组扫描结果整理为 vanity() 的返回格式。"""
+    if exact:
+        return [
+            {"uid": uid_int.to_bytes(16, "big"), "base64": b64, "score": target_len}
+            for b64, uid_int in exact[:top_n]
+        ]
+    best = heapq.nlargest(top_n, fuzzy)
+    return [
+        {"uid": uid_int.to_bytes(16, "big"), "base64": rev_b64.translate(_B64_REVERSE), "score": score}
+        for score, rev_b64, uid_int in best
+    ]
+
+
+def _vanity_setup(app_id: int, workers: int, seconds: float, time_origin_ms: Optional[int],
+                  max_wall_seconds: Optional[float],
+                  _key: Optional[bytes], _iam32: Optional[int]) -> tuple:
+    """vanity() / vanity_many() 共用的参数校验与准备，返回 (key, iam32, t_start, total_ms, wall_deadline)。"""
+    if not (0 <= app_id <= _SEQ16_MAX):
+        raise ValueError(f"app_id 超出范围 [0, 65535]: {app_id}")
+    if workers < 1:
+        raise ValueError(f"workers 必须 >= 1: {workers}")
+
+    key = _key if _key is not None else _default_generator.key()
+    iam32 = _iam32 if _iam32 is not None else _default_generator.iam32()
+    t_start = time_origin_ms if time_origin_ms is not None else _now_ms()
+
+    total_ms = int(seconds * 1000)
+    # 用 time.time() 而非 monotonic：截止时间需要跨进程比较
+    wall_deadline = (time.time() + max_wall_seconds) if max_wall_seconds else None
+    return key, iam32, t_start, total_ms, wall_deadline
+
+
+def _vanity_chunk_results(scan, scan_kwargs: dict, bounds: list[tuple[int, int]], workers: int):
+    """按切片顺序逐个产出 (ms_hi, exact, fuzzy, timed_out)。
+
+    workers > 1 时切片提交到进程池并行扫描，仍按切片顺序产出；生成器被关闭时取消未开始的切片。
+    """
+    if workers <= 1:
+        for lo, hi in bounds:
+            yield (hi, *scan(ms_lo=lo, ms_hi=hi, **scan_kwargs))
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(scan, ms_lo=lo, ms_hi=hi, **scan_kwargs) for lo, hi in bounds]
+        try:
+            for (_, hi), fut in zip(bounds, futures):
+                yield (hi, *fut.result())
+        finally:
+            for f in futures:
+                f.cancel()
+
+
+def _vanity_run(
+    scan, scan_kwargs: dict, workers: int, total_ms: int, top_n: int,
+    *, start_ms: int = 0, state: Optional[tuple] = None, chunk_ms: Optional[int] = None,
+    on_progress=None,
+) -> tuple[list[list[tuple[str, int]]], list[list[tuple[int, str, int]]]]:
+    """串行或并行执行 scan，覆盖毫秒偏移 [start_ms, total_ms)，返回按组的 (exact, fuzzy)。
+
+    范围按切片扫描并按切片顺序逐组合并：
+    精确命中按切片顺序拼接（与串行扫描顺序一致），每组都凑满 top_n 时提前结束；
+    模糊候选各切片独立保留 top_n，合并后再取 top_n，与一次扫完的结果相同。
+
+    Args:
+        scan:        _vanity_many_scan
+        scan_kwargs: 除 ms_lo / ms_hi 外的 scan 参数
+        start_ms/state: 断点续搜时的起点与已有 (exact, fuzzy)
+        chunk_ms:    切片大小；缺省时串行一次扫完，并行按进程数切成 4 倍片数
+        on_progress: 每合并完一个未超时的切片后回调 on_progress(done_ms, exact, fuzzy)
+    """
+    remaining = total_ms - start_ms
+    if chunk_ms is None:
+        chunk_ms = max(1, -(-remaining // (workers * 4))) if workers > 1 else max(1, remaining)
+    bounds = [(lo, min(lo + chunk_ms, total_ms)) for lo in range(start_ms, total_ms, chunk_ms)]
+
+    exact, fuzzy = state if state is not None else (None, None)
+    if exact is not None and all(len(group) >= top_n for group in exact):
+        return exact, fuzzy
+    complete = True  # 到目前为止的切片都没有超时
+    chunks = _vanity_chunk_results(scan, scan_kwargs, bounds, workers)
+    try:
+        for hi, part_exact, part_fuzzy, timed_out in chunks:
+            if exact is None:
+                exact = [[] for _ in part_exact]
+                fuzzy = [[] for _ in part_fuzzy]
+            for acc, part in zip(exact, part_exact):
+                acc.extend(part[:top_n - len(acc)])
+            for i, part in enumerate(part_fuzzy):
+                fuzzy[i] = heapq.nlargest(top_n, fuzzy[i] + part)
+            complete = complete and not timed_out
+            if complete and on_progress is not None:
+                on_progress(hi, exact, fuzzy)
+            if all(len(group) >= top_n for group in exact):
+                break
+    finally:
+        chunks.close()
+
+    if exact is None:  # 范围为空
+        exact, fuzzy, _ = scan(ms_lo=start_ms, ms_hi=start_ms, **scan_kwargs)
+    return exact, fuzzy
+
+
+# ── Vanity checkpoint ───────────────────────────────────────────────
+
+_VANITY_CKPT_VERSION = 1
+_VANITY_CKPT_CHUNK_MS = 100  # 启用断点时每个切片的毫秒数 (~6.5M 候选)
+
+
+def _vanity_ckpt_params(scan_kwargs: dict, total_ms: int) -> dict:
+    """断点文件中用于校验"是同一次搜索"的参数；key 只记录指纹。"""
+    params = {
+        k: v for k, v in scan_kwargs.items()
+        if k not in ("key", "wall_deadline")
+    }
+    params["key_fp"] = hashlib.sha256(scan_kwargs["key"]).hexdigest()[:16]
+    params["total_ms"] = total_ms
+    return params
+
+
+def _vanity_ckpt_save(path: str, params: dict, done_ms: int,
+                      exact: list[list[tuple[str, int]]],
+                      fuzzy: list[list[tuple[int, str, int]]]) -> None:
+    """写断点文件：先写临时文件再 os.replace，保证原子性。"""
+    data = {
+        "version": _VANITY_CKPT_VERSION,
+        "params": params,
+        "done_ms": done_ms,
+        "exact": [[[b64, f"{uid_int:032x}"] for b64, uid_int in group] for group in exact],
+        "fuzzy": [[[score, rev_b64, f"{uid_int:032x}"] for score, rev_b64, uid_int in group] for group in fuzzy],
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _vanity_ckpt_load(path: str) -> Optional[dict]:
+    """读断点文件，文件不存在返回 None。"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    if data.get("version") != _VANITY_CKPT_VERSION:
+        raise ValueError(f"不支持的断点文件版本: {data.get('version')!r}")
+    data["exact"] = [[(b64, int(uid, 16)) for b64, uid in group] for group in data["exact"]]
+    data["fuzzy"] = [[(score, rev_b64, int(uid, 16)) for score, rev_b64, uid in group] for group in data["fuzzy"]]
+    return data
+
+
+def _vanity_search(
+    scan, scan_kwargs: dict, *, workers: int, total_ms: int, top_n: int,
+    time_origin_ms: Optional[int],
+    checkpoint: Optional[str], checkpoint_interval: float, resume: Optional[str],
+) -> tuple[list[list[tuple[str, int]]], list[list[tuple[int, str, int]]]]:
+    """vanity() / vanity_many() 的执行入口：处理断点续搜后调用 _vanity_run。"""
+    start_ms = 0
+    state = None
+    if resume is not None:
+        data = _vanity_ckpt_load(resume)
+        if data is not None:
+            if time_origin_ms is None:
+                # 续搜沿用断点中的时间起点
+                scan_kwargs["t_start"] = data["params"]["t_start"]
+            params = _vanity_ckpt_params(scan_kwargs, total_ms)
+            if data["params"] != params:
+                raise ValueError(f"断点文件与本次搜索参数不一致: {resume}")
+            start_ms = data["done_ms"]
+            state = (data["exact"], data["fuzzy"])
+
+    if checkpoint is None:
+        return _vanity_run(scan, scan_kwargs, workers, total_ms, top_n, start_ms=start_ms, state=state)
+
+    params = _vanity_ckpt_params(scan_kwargs, total_ms)
+    snapshot = None  # 最近一个完整切片之后的 (done_ms, exact, fuzzy)
+    last_save = time.monotonic()
+
+    def on_progress(done_ms, exact, fuzzy):
+        nonlocal snapshot, last_save
+        # 后续（可能超时的）切片会原地追加 exact，这里存副本
+        snapshot = (done_ms, [list(g) for g in exact], [list(g) for g in fuzzy])
+        if time.monotonic() - last_save >= checkpoint_interval:
+            _vanity_ckpt_save(checkpoint, params, *snapshot)
+            last_save = time.monotonic()
+
+    exact, fuzzy = _vanity_run(
+        scan, scan_kwargs, workers, total_ms, top_n, start_ms=start_ms, state=state,
+        chunk_ms=_VANITY_CKPT_CHUNK_MS, on_progress=on_progress,
+    )
+    # 结束（扫完 / 超时 / 凑满 top_n）时落盘最后一个完整切片的进度
+    if snapshot is not None:
+        _vanity_ckpt_save(checkpoint, params, *snapshot)
+    return exact, fuzzy
 
 
 def vanity(
@@ -424,6 +1806,11 @@ def vanity(
     time_origin_ms: Optional[int] = None,
     max_wall_seconds: Optional[float] = None,
     top_n: int = 20,
+    workers: int = 1,
+    prune: bool = False,
+    checkpoint: Optional[str] = None,
+    checkpoint_interval: float = 60.0,
+    resume: Optional[str] = None,
     _key: Optional[bytes] = None,
     _iam32: Optional[int] = None,
 ) -> list[dict]:
@@ -440,108 +1827,104 @@ def vanity(
         time_origin_ms: 搜索起始时间 (相对于 ATSIHID 纪元的毫秒数)，
                         缺省取当前时间
         max_wall_seconds: 最大墙钟搜索时间 (秒)，超时后返回已有最优结果。
-                          None 表示不限制 (仅受 seconds 搜索空间限制)
+                          None 表示不限制 (仅受 seconds 搜索空间限制)。
+                          并行模式下对所有进程统一生效
         top_n:          未精确命中时返回的模糊候选数量 (默认 20)
+        workers:        并行进程数，> 1 时按毫秒切片分给进程池 (默认 1，串行)。
+                        未超时的情况下结果与串行完全一致
+        prune:          True 时只做精确搜索：按字符位置分析跳过不可能命中的毫秒和 seq，
+                        只对仍可能命中的候选计算 HMAC。精确命中与 prune=False 相同，
+                        但不收集模糊候选（无命中时返回空列表）
+        checkpoint:     断点文件路径。按 100ms 切片扫描，每隔 checkpoint_interval 秒
+                        以及结束（扫完 / 超时）时，原子写入已完成的毫秒偏移和当前结果
+        checkpoint_interval: 断点写入间隔 (秒，默认 60)
+        resume:         从该断点文件继续搜索（文件不存在则从头开始），参数须与断点一致；
+                        未指定 time_origin_ms 时沿用断点中的时间起点。
+                        可与 checkpoint 取同一路径，把长时间搜索分多次完成
         _key/_iam32:    测试用覆盖参数
 
     Returns:
         命中列表，每项为 {"uid": bytes, "base64": str, "score": int}。
         score == len(target) 表示精确命中。
-        按 score 降序、base64 升序排列。
+        精确命中按扫描顺序排列；模糊候选按 score 降序、base64 升序排列。
     """
-    if not (0 <= app_id <= _SEQ16_MAX):
-        raise ValueError(f"app_id 超出范围 [0, 65535]: {app_id}")
     if not target:
         raise ValueError("target 不能为空")
+    key, iam32, t_start, total_ms, wall_deadline = _vanity_setup(
+        app_id, workers, seconds, time_origin_ms, max_wall_seconds, _key, _iam32)
+
+    scan_kwargs = dict(app_id=app_id, key=key, iam32=iam32, t_start=t_start, targets=[target], regexes=[],
+                       case_sensitive=case_sensitive, top_n=top_n, wall_deadline=wall_deadline, prune=prune)
+    exact, fuzzy = _vanity_search(
+        _vanity_many_scan, scan_kwargs, workers=workers, total_ms=total_ms, top_n=top_n,
+        time_origin_ms=time_origin_ms, checkpoint=checkpoint,
+        checkpoint_interval=checkpoint_interval, resume=resume,
+    )
+    return _vanity_results(exact[0], fuzzy[0], len(target), top_n)
 
-    key = _key if _key is not None else _load_key()
-    iam32 = _iam32 if _iam32 is not None else _load_iam()
-    t_start = time_origin_ms if time_origin_ms is not None else _now_ms()
-
-    total_ms = int(seconds * 1000)
-    target_len = len(target)
-    match_target = target if case_sensitive else target.lower()
-
-    exact_matches: list[dict] = []
-    # 模糊候选：保留 top_n 个最高分，(score, base64, uid_int)
-    fuzzy: list[tuple[int, str, int]] = []
-    fuzzy_min_score = 0
-
-    # 预计算子串表 (用于快速模糊匹配)
-    sub_table = _build_substring_table(target, case_sensitive)
-
-    # 预计算常量
-    app_hi = app_id << 112  # app_id 在 128-bit 中的位置
-    iam_bytes = iam32.to_bytes(4, "big")
-    wall_deadline = (time.monotonic() + max_wall_seconds) if max_wall_seconds else None
-
-    _hmac = _hmac_sha256
-    _to_b64 = _int_to_base64
-    _mono = time.monotonic
-
-    timed_out = False
-    for ms_offset in range(total_ms):
-        if timed_out:
-            break
-        t48 = t_start + ms_offset
-        if t48 < 0 or t48 > _TIME48_MAX:
-            continue
-
-        time_bytes = t48.to_bytes(6, "big")
-        obs = _hmac(key, time_bytes)[:6]
-        obs_iam = bytes(a ^ b for a, b in zip(iam_bytes, obs[:4]))
-        obs_iam_int = int.from_bytes(obs_iam, "big")
-        obs_tail_0 = obs[4]
-        obs_tail_1 = obs[5]
-
-        # uid 高 80 bits 中，app + time 部分是常量
-        prefix = app_hi | (t48 << 64)
-        # masked_iam 在 uid 的 bit[16..48] 区间
-        masked_iam_shifted = obs_iam_int << 16
 
-        app_time_bytes = app_id.to_bytes(2, "big") + time_bytes
+def vanity_many(
+    app_id: int,
+    targets: list[str],
+    *,
+    regex: Optional[str] = None,
+    seconds: float = 1.0,
+    case_sensitive: bool = True,
+    time_origin_ms: Optional[int] = None,
+    max_wall_seconds: Optional[float] = None,
+    top_n: int = 20,
+    workers: int = 1,
+    prune: bool = False,
+    checkpoint: Optional[str] = None,
+    checkpoint_interval: float = 60.0,
+    resume: Optional[str] = None,
+    _key: Optional[bytes] = None,
+    _iam32: Optional[int] = None,
+) -> dict[str, list[dict]]:
+    """一次扫描同时搜索多个 target（及可选的正则），结果按 pattern 分组。
 
-        for seq16 in range(1 << 16):
-            # 每 4096 次检查一次墙钟时间
-            if wall_deadline and (seq16 & 0xFFF) == 0 and _mono() >= wall_deadline:
-                timed_out = True
-                break
+    每个候选的 base64 只用一个 Aho-Corasick 自动机 (_VanityAutomaton) 走一遍，
+    同时得到所有 target 的精确 / 模糊得分；HMAC 扫描只做一次。
 
-            hmac_16 = _hmac(key, app_time_bytes + seq16.to_bytes(2, "big") + iam_bytes)[:2]
-            xored_hmac = (hmac_16[0] ^ obs_tail_0) << 8 | (hmac_16[1] ^ obs_tail_1)
+    Args:
+        targets: 目标子串列表（可为空，但 targets 与 regex 不能都为空）
+        regex:   可选的正则表达式，对 base64 做 search，只收集精确命中 (score = 匹配长度)。
+                 case_sensitive=False 时带 re.IGNORECASE；有正则时 prune 不生效
+        其余参数同 vanity()，top_n / prune 对每个 pattern 分别生效，断点文件同样适用
 
-            uid_int = prefix | (seq16 << 48) | masked_iam_shifted | xored_hmac
-            b64 = _to_b64(uid_int)
+    Returns:
+        {pattern: 命中列表}，pattern 为 target 原文或正则原文；
+        每个列表的格式和排序规则同 vanity() 的返回值。
+    """
+    targets = list(dict.fromkeys(targets))  # 去重并保持顺序
+    if any(not t for t in targets):
+        raise ValueError("target 不能为空")
+    if not targets and not regex:
+        raise ValueError("targets 与 regex 不能都为空")
+    regexes = [regex] if regex else []
+    key, iam32, t_start, total_ms, wall_deadline = _vanity_setup(
+        app_id, workers, seconds, time_origin_ms, max_wall_seconds, _key, _iam32)
+
+    scan_kwargs = dict(app_id=app_id, key=key, iam32=iam32, t_start=t_start, targets=targets,
+                       regexes=regexes, case_sensitive=case_sensitive, top_n=top_n,
+                       wall_deadline=wall_deadline, prune=prune)
+    exact, fuzzy = _vanity_search(
+        _vanity_many_scan, scan_kwargs, workers=workers, total_ms=total_ms, top_n=top_n,
+        time_origin_ms=time_origin_ms, checkpoint=checkpoint,
+        checkpoint_interval=checkpoint_interval, resume=resume,
+    )
 
-            haystack = b64 if case_sensitive else b64.lower()
-            if match_target in haystack:
-                uid = uid_int.to_bytes(16, "big")
-                exact_matches.append({
-                    "uid": uid, "base64": b64, "score": target_len,
-                })
-                if len(exact_matches) >= top_n:
-                    return exact_matches
-            elif len(fuzzy) < top_n or fuzzy_min_score < target_len:
-                score = _fuzzy_score_fast(haystack, sub_table, fuzzy_min_score)
-                if score > 0 and (len(fuzzy) < top_n or score > fuzzy_min_score):
-                    if len(fuzzy) < top_n:
-                        fuzzy.append((score, b64, uid_int))
-                        if len(fuzzy) == top_n:
-                            fuzzy.sort(key=lambda x: (-x[0], x[1]))
-                            fuzzy_min_score = fuzzy[-1][0]
-                    else:
-                        fuzzy[-1] = (score, b64, uid_int)
-                        fuzzy.sort(key=lambda x: (-x[0], x[1]))
-                        fuzzy_min_score = fuzzy[-1][0]
-
-    if exact_matches:
-        return exact_matches
-
-    fuzzy.sort(key=lambda x: (-x[0], x[1]))
-    return [
-        {"uid": uid_int.to_bytes(16, "big"), "base64": b64, "score": score}
-        for score, b64, uid_int in fuzzy
-    ]
+    results: dict[str, list[dict]] = {}
+    for i, t in enumerate(targets):
+        results[t] = _vanity_results(exact[i], fuzzy[i], len(t), top_n)
+    if regex:
+        flags = 0 if case_sensitive else re.IGNORECASE
+        rx = re.compile(regex, flags)
+        results[regex] = [
+            {"uid": uid_int.to_bytes(16, "big"), "base64": b64, "score": len(rx.search(b64).group())}
+            for b64, uid_int in exact[-1][:top_n]
+        ]
+    return results
 
 
 # ── CLI demo ─────────────────────────────────────────────────────────
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+ATSIHID 性能基准
+
+用法：
+    python -m lebase.crypt.atsihid_bench [-n 20000] [--threads 1,2,4] [--json out.json]
+    python -m lebase.crypt.atsihid_bench --compare base.json [--json new.json]
+    python -m lebase.crypt.atsihid_bench --paths
+
+默认运行完整套件：generate (随机 / 顺序 / 单调)、decode、to_base64 / from_base64 在各线程数下的吞吐 (ops/sec)，
+HMAC 模板与 hmac.new 的单线程吞吐，sort 对 1M 个 ID 的吞吐，以及 vanity 每秒检查的候选数 (并行度 = 进程数)。
+全部使用固定的 _key / _iam32 / _time_ms 与固定随机种子，无需 LEFAC_256 或 IAM.txt，
+结果可用 --json 写出，并用 --compare 与另一次提交的结果逐项对比。
+
+--paths 对比每个 ID 都重新读取 key / IAM.txt（旧路径）与 Generator 缓存后的生成速度，
+以及循环 generate() 与批量 generate_many() 的速度。
+若未设置 LEFAC_256，会临时生成一个随机 key；IAM.txt 缺失时按 generate() 的既有逻辑以 MAC 回退创建。
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import platform
+import random
+import secrets
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+from lebase.crypt.atsihid import (
+    Generator, _HmacTemplate, _load_iam, _load_key, decode, from_base64, generate, generate_many,
+    iam_to_32bit, sort, to_base64, vanity,
+)
+
+# 固定参数：结果只取决于代码与机器
+_BENCH_KEY = bytes.fromhex("ab" * 32)
+_BENCH_IAM32 = iam_to_32bit("PC01")
+_BENCH_TIME = 1000
+_FIXED = dict(_key=_BENCH_KEY, _iam32=_BENCH_IAM32)
+_SEED = 20240101
+
+
+def _rate(fn, n: int) -> float:
+    """执行 fn() n 次，返回每秒次数。"""
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    elapsed = time.perf_counter() - t0
+    return n / elapsed if elapsed > 0 else float("inf")
+
+
+def _threaded_rate(work: Callable[[int, int], None], n: int, threads: int) -> float:
+    """把 [0, n) 均分给 threads 个线程，各自执行 work(lo, hi)，返回总吞吐 (墙钟 ops/sec)。"""
+    bounds = [(n * i // threads, n * (i + 1) // threads) for i in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def runner(lo: int, hi: int) -> None:
+        barrier.wait()
+        work(lo, hi)
+
+    pool = [threading.Thread(target=runner, args=b) for b in bounds]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    return n / elapsed if elapsed > 0 else float("inf")
+
+
+# ── 单项基准 ────────────────────────────────────────────────────────
+
+def bench_generate_random(n: int, threads: int) -> float:
+    return _threaded_rate(
+        lambda lo, hi: [generate(1, _time_ms=_BENCH_TIME, **_FIXED) for _ in range(lo, hi)], n, threads)
+
+
+def bench_generate_sequential(n: int, threads: int) -> float:
+    return _threaded_rate(
+        lambda lo, hi: [generate(1, sequential=True, _time_ms=_BENCH_TIME, **_FIXED) for _ in range(lo, hi)],
+        n, threads)
+
+
+def bench_generate_monotonic(n: int, threads: int) -> float:
+    return _threaded_rate(
+        lambda lo, hi: [generate(1, monotonic=True, _time_ms=_BENCH_TIME, **_FIXED) for _ in range(lo, hi)],
+        n, threads)
+
+
+def bench_decode(ids: list[bytes], threads: int) -> float:
+    return _threaded_rate(lambda lo, hi: [decode(u, _key=_BENCH_KEY) for u in ids[lo:hi]], len(ids), threads)
+
+
+def bench_to_base64(ids: list[bytes], threads: int) -> float:
+    return _threaded_rate(lambda lo, hi: [to_base64(u) for u in ids[lo:hi]], len(ids), threads)
+
+
+def bench_from_base64(strs: list[str], threads: int) -> float:
+    return _threaded_rate(lambda lo, hi: [from_base64(s) for s in strs[lo:hi]], len(strs), threads)
+
+
+def bench_hmac(n: int) -> dict:
+    """每个 ID 的 HMAC：hmac.new 每次重新派生 key vs 预计算的 _HmacTemplate（前缀 8 字节、后缀 6 字节）。"""
+    prefix, suffix = b"\x00" * 8, b"\x00" * 6
+    tmpl = _HmacTemplate.from_key(_BENCH_KEY).prefixed(prefix)
+    base = _rate(lambda: hmac.new(_BENCH_KEY, prefix + suffix, hashlib.sha256).digest(), n)
+    after = _rate(lambda: tmpl.digest(suffix), n)
+    return {"hmac_new_per_sec": base, "template_per_sec": after, "speedup": after / base}
+
+
+def bench_sort(n: int) -> float:
+    """对 n 个固定随机 16-byte ID 排序的吞吐 (IDs/sec)；排序本身单线程，只测一次。"""
+    blob = random.Random(_SEED).randbytes(16 * n)
+    ids = [blob[i:i + 16] for i in range(0, 16 * n, 16)]
+    t0 = time.perf_counter()
+    sort(ids)
+    elapsed = time.perf_counter() - t0
+    return n / elapsed if elapsed > 0 else float("inf")
+
+
+def bench_vanity(ms: int, workers: int) -> float:
+    """vanity 搜索 ms 毫秒空间 (ms * 65536 个候选) 的吞吐 (candidates/sec)。
+
+    目标串取不可能命中的长串，保证扫完整个空间；workers 为进程数。
+    """
+    t0 = time.perf_counter()
+    vanity(1, "~" * 8, seconds=ms / 1000, case_sensitive=True, time_origin_ms=_BENCH_TIME,
+           top_n=1, workers=workers, **_FIXED)
+    elapsed = time.perf_counter() - t0
+    return ms * 65536 / elapsed if elapsed > 0 else float("inf")
+
+
+def run_suite(n: int = 20000, threads: tuple[int, ...] = (1, 2, 4),
+              sort_n: int = 1_000_000, vanity_ms: int = 20,
+              log: Optional[Callable[[dict], None]] = None) -> dict:
+    """运行完整套件，返回 {"meta": {...}, "results": [{"case", "threads", "ops_per_sec", "unit"}, ...]}。"""
+    ids = generate_many(1, n, sequential=True, _time_ms=_BENCH_TIME, **_FIXED)
+    strs = [to_base64(u) for u in ids]
+
+    results = []
+
+    def record(case: str, t: int, value: float, unit: str) -> None:
+        row = {"case": case, "threads": t, "ops_per_sec": value, "unit": unit}
+        results.append(row)
+        if log is not None:
+            log(row)
+
+    for t in threads:
+        record("generate_random", t, bench_generate_random(n, t), "ids/s")
+        record("generate_sequential", t, bench_generate_sequential(n, t), "ids/s")
+        record("generate_monotonic", t, bench_generate_monotonic(n, t), "ids/s")
+        record("decode", t, bench_decode(ids, t), "ids/s")
+        record("to_base64", t, bench_to_base64(ids, t), "ids/s")
+        record("from_base64", t, bench_from_base64(strs, t), "ids/s")
+    res = bench_hmac(n)
+    record("hmac_new", 1, res["hmac_new_per_sec"], "hmacs/s")
+    record("hmac_template", 1, res["template_per_sec"], "hmacs/s")
+    record("sort", 1, bench_sort(sort_n), "ids/s")
+    for t in threads:
+        record("vanity", t, bench_vanity(vanity_ms, t), "candidates/s")
+
+    meta = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "n": n, "threads": list(threads), "sort_n": sort_n, "vanity_ms": vanity_ms,
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(base: dict, new: dict) -> list[dict]:
+    """按 (case, threads) 对齐两份结果，返回 [{"case", "threads", "base", "new", "ratio"}, ...]。"""
+    old = {(r["case"], r["threads"]): r["ops_per_sec"] for r in base["results"]}
+    rows = []
+    for r in new["results"]:
+        k = (r["case"], r["threads"])
+        if k in old:
+            rows.append({"case": k[0], "threads": k[1], "base": old[k], "new": r["ops_per_sec"],
+                         "ratio": r["ops_per_sec"] / old[k] if old[k] else float("inf")})
+    return rows
+
+
+# ── key / IAM 加载路径对比 ─────────────────────────────────────────
+
+def bench_generate(n: int) -> dict:
+    """旧路径 (每次 _load_key + _load_iam) vs Generator 缓存路径。"""
+    gen = Generator()
+    before = _rate(lambda: generate(1, _key=_load_key(), _iam32=_load_iam()), n)
+    after = _rate(lambda: gen.generate(1), n)
+    return {"before_ids_per_sec": before, "after_ids_per_sec": after, "speedup": after / before}
+
+
+def bench_generate_many(n: int) -> dict:
+    """循环调用 generate() vs 一次 generate_many()，使用固定 key / IAM。"""
+    key = secrets.token_bytes(32)
+    iam32 = 0
+    loop = _rate(lambda: generate(1, sequential=True, _key=key, _iam32=iam32), n)
+    t0 = time.perf_counter()
+    generate_many(1, n, sequential=True, _key=key, _iam32=iam32)
+    elapsed = time.perf_counter() - t0
+    batch = n / elapsed if elapsed > 0 else float("inf")
+    return {"loop_ids_per_sec": loop, "batch_ids_per_sec": batch, "speedup": batch / loop}
+
+
+def _main_paths(n: int) -> None:
+    os.environ.setdefault("LEFAC_256", secrets.token_hex(32))
+
+    res = bench_generate(n)
+    print(f"generate (per-call load): {res['before_ids_per_sec']:>12,.0f} IDs/sec")
+    print(f"generate (Generator):     {res['after_ids_per_sec']:>12,.0f} IDs/sec")
+    print(f"speedup:                  {res['speedup']:>12.2f}x")
+
+    res = bench_generate_many(n)
+    print(f"generate (loop):          {res['loop_ids_per_sec']:>12,.0f} IDs/sec")
+    print(f"generate_many:            {res['batch_ids_per_sec']:>12,.0f} IDs/sec")
+    print(f"speedup:                  {res['speedup']:>12.2f}x")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="ATSIHID benchmark")
+    parser.add_argument("-n", type=int, default=20000, help="每项测量的 ID 数量")
+    parser.add_argument("--threads", default="1,2,4", help="逗号分隔的线程数 (vanity 为进程数)")
+    parser.add_argument("--sort-n", type=int, default=1_000_000, help="sort 基准的 ID 数量")
+    parser.add_argument("--vanity-ms", type=int, default=20, help="vanity 基准搜索的毫秒数 (每毫秒 65536 个候选)")
+    parser.add_argument("--json", metavar="PATH", help="把结果写入 JSON 文件")
+    parser.add_argument("--compare", metavar="PATH", help="与之前写出的 JSON 结果逐项对比")
+    parser.add_argument("--paths", action="store_true", help="只运行 key / IAM 加载路径对比")
+    args = parser.parse_args(argv)
+
+    if args.paths:
+        _main_paths(args.n)
+        return
+
+    threads = tuple(int(x) for x in args.threads.split(",") if x.strip())
+    report = run_suite(
+        args.n, threads, sort_n=args.sort_n, vanity_ms=args.vanity_ms,
+        log=lambda r: print(f"{r['case']:<20} threads={r['threads']:<3} {r['ops_per_sec']:>14,.0f} {r['unit']}"),
+    )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            base = json.load(f)
+        print()
+        for r in compare(base, report):
+            print(f"{r['case']:<20} threads={r['threads']:<3} {r['base']:>14,.0f} -> {r['new']:>14,.0f}"
+                  f"  {r['ratio']:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,11 +1,20 @@
 # -*- coding: utf-8 -*-
+import hashlib
+import hmac
+import json
 import os
+import tempfile
+import time
 import unittest
+from unittest import mock
 
 from crypt.atsihid import (
-    generate, decode, to_base64, from_base64, sort, vanity,
-    validate_iam, iam_to_32bit, decode_iam_32,
-    _EPOCH_MS,
+    Generator, generate, generate_many, decode, decode_many, to_base64, from_base64, sort, vanity, vanity_many,
+    to_base64_many, from_base64_many, range_bounds, SortedIdIndex,
+    pack_ids, unpack_ids, iter_packed_ids, IdPool,
+    validate_iam, iam_to_32bit, decode_iam_32, obs_cache_info, obs_cache_clear,
+    _EPOCH_MS, _load_iam, _now_ms, _seq_counter, _MonotonicSeq, _HmacTemplate,
+    _VanityAutomaton, _vanity_ckpt_save,
 )
 
 # 固定测试参数
@@ -96,6 +105,105 @@ class TestGenerate(unittest.TestCase):
             self._gen(app_id=70000)
 
 
+class TestGenerateMany(unittest.TestCase):
+    _kw = dict(_key=_TEST_KEY, _iam32=_TEST_IAM32, _time_ms=_TEST_TIME)
+
+    def test_identical_to_generate(self):
+        _seq_counter._val = 65534  # 覆盖回绕
+        expected = [generate(7, sequential=True, **self._kw) for _ in range(5)]
+        _seq_counter._val = 65534
+        self.assertEqual(generate_many(7, 5, sequential=True, **self._kw), expected)
+
+    def test_packed(self):
+        _seq_counter._val = 0
+        ids = generate_many(1, 4, sequential=True, **self._kw)
+        _seq_counter._val = 0
+        buf = generate_many(1, 4, sequential=True, packed=True, **self._kw)
+        self.assertEqual(len(buf), 64)
+        self.assertEqual(buf, b"".join(ids))
+
+    def test_random_seq_valid(self):
+        for uid in generate_many(3, 50, **self._kw):
+            info = decode(uid, _key=_TEST_KEY)
+            self.assertTrue(info["hmac_ok"])
+            self.assertEqual(info["app_id"], 3)
+            self.assertEqual(info["iam"], "PC01")
+
+    def test_empty(self):
+        self.assertEqual(generate_many(1, 0, **self._kw), [])
+        self.assertEqual(generate_many(1, 0, packed=True, **self._kw), b"")
+
+
+class TestMonotonic(unittest.TestCase):
+    _kw = dict(_key=_TEST_KEY, _iam32=_TEST_IAM32)
+
+    def setUp(self):
+        patcher = mock.patch("crypt.atsihid._monotonic_seq", _MonotonicSeq(block=64))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_seq_resets_per_ms(self):
+        a = [generate(1, monotonic=True, _time_ms=_TEST_TIME, **self._kw) for _ in range(3)]
+        b = generate(1, monotonic=True, _time_ms=_TEST_TIME + 1, **self._kw)
+        self.assertEqual([decode(u, _key=_TEST_KEY)["seq"] for u in a], [0, 1, 2])
+        self.assertEqual(decode(b, _key=_TEST_KEY)["seq"], 0)
+        self.assertEqual(sorted(a + [b]), a + [b])
+
+    def test_time_bumps_when_ms_exhausted(self):
+        ids = generate_many(1, 65536 + 10, monotonic=True, _time_ms=_TEST_TIME, **self._kw)
+        self.assertEqual(sorted(ids), ids)
+        self.assertEqual(len(set(ids)), len(ids))
+        last = decode(ids[-1], _key=_TEST_KEY)
+        self.assertEqual(last["time_ms"] - decode(ids[0], _key=_TEST_KEY)["time_ms"], 1)
+        self.assertEqual(last["seq"], 9)
+        self.assertTrue(last["hmac_ok"])
+        # 时钟未追上时继续使用借用的毫秒
+        nxt = generate(1, monotonic=True, _time_ms=_TEST_TIME, **self._kw)
+        self.assertGreater(nxt, ids[-1])
+
+    def test_many_matches_single(self):
+        ids = generate_many(2, 100, monotonic=True, _time_ms=_TEST_TIME, **self._kw)
+        one = generate(2, monotonic=True, _time_ms=_TEST_TIME, **self._kw)
+        self.assertEqual(decode(one, _key=_TEST_KEY)["seq"], 100)
+        self.assertTrue(all(decode(u, _key=_TEST_KEY)["hmac_ok"] for u in ids))
+
+    def test_mixed_single_and_many_increasing(self):
+        """同一线程、同一毫秒内交替调用 generate 与 generate_many，ID 严格递增。"""
+        ids = [generate(4, monotonic=True, _time_ms=_TEST_TIME, **self._kw)]
+        ids += generate_many(4, 3, monotonic=True, _time_ms=_TEST_TIME, **self._kw)
+        ids.append(generate(4, monotonic=True, _time_ms=_TEST_TIME, **self._kw))
+        ids += generate_many(4, 2, monotonic=True, _time_ms=_TEST_TIME, **self._kw)
+        ids.append(generate(4, monotonic=True, _time_ms=_TEST_TIME, **self._kw))
+        self.assertTrue(all(a < b for a, b in zip(ids, ids[1:])))
+
+    def test_exclusive_with_sequential(self):
+        with self.assertRaises(ValueError):
+            generate(1, sequential=True, monotonic=True, **self._kw)
+        with self.assertRaises(ValueError):
+            generate_many(1, 2, sequential=True, monotonic=True, **self._kw)
+
+    def test_concurrent_stress(self):
+        import threading
+        n_threads, per_thread = 8, 5000
+        results = [None] * n_threads
+
+        def worker(i):
+            results[i] = [generate(3, monotonic=True, **self._kw) for _ in range(per_thread)]
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        all_ids = []
+        for ids in results:
+            heads = [u[:10] for u in ids]  # app | time | seq
+            self.assertTrue(all(a < b for a, b in zip(heads, heads[1:])))
+            all_ids.extend(heads)
+        self.assertEqual(len(set(all_ids)), n_threads * per_thread)
+
+
 class TestDecode(unittest.TestCase):
     def test_roundtrip(self):
         uid = generate(42, _key=_TEST_KEY, _iam32=_TEST_IAM32, _time_ms=_TEST_TIME)
@@ -141,6 +249,226 @@ class TestDecode(unittest.TestCase):
         self.assertAlmostEqual(info["time_unix"], expected_unix, places=3)
 
 
+class TestGenerator(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.iam_path = os.path.join(self._tmp.name, "IAM.txt")
+        with open(self.iam_path, "w", encoding="utf-8") as f:
+            f.write("PC01")
+        self._patches = [
+            mock.patch("crypt.atsihid._iam_path", return_value=self.iam_path),
+            mock.patch.dict(os.environ, {"LEFAC_256": _TEST_KEY.hex()}),
+        ]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self._patches):
+            p.stop()
+        self._tmp.cleanup()
+
+    def test_matches_module_generate(self):
+        gen = Generator()
+        uid = gen.generate(1, _time_ms=_TEST_TIME)
+        info = decode(uid, _key=_TEST_KEY)
+        self.assertTrue(info["hmac_ok"])
+        self.assertEqual(info["iam"], "PC01")
+        self.assertTrue(gen.decode(uid)["hmac_ok"])
+
+    def test_iam_loaded_once(self):
+        gen = Generator()
+        with mock.patch("crypt.atsihid._load_iam", wraps=_load_iam) as m:
+            for _ in range(10):
+                gen.generate(1, _time_ms=_TEST_TIME)
+        self.assertEqual(m.call_count, 1)
+
+    def test_reload_on_iam_change(self):
+        gen = Generator()
+        self.assertEqual(gen.iam32(), iam_to_32bit("PC01"))
+        with open(self.iam_path, "w", encoding="utf-8") as f:
+            f.write("Q2")
+        st = os.stat(self.iam_path)
+        os.utime(self.iam_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        self.assertEqual(gen.iam32(), iam_to_32bit("Q2"))
+
+    def test_reload_on_env_change(self):
+        gen = Generator()
+        self.assertEqual(gen.key(), _TEST_KEY)
+        other = bytes.fromhex("cd" * 32)
+        os.environ["LEFAC_256"] = other.hex()
+        self.assertEqual(gen.key(), other)
+
+    def test_fixed_overrides(self):
+        gen = Generator(key=_TEST_KEY, iam32=_TEST_IAM32)
+        os.environ["LEFAC_256"] = "cd" * 32
+        uid = gen.generate(1, _time_ms=_TEST_TIME)
+        self.assertTrue(decode(uid, _key=_TEST_KEY)["hmac_ok"])
+
+
+class TestDecodeMany(unittest.TestCase):
+    def _ids(self):
+        ip32 = (192 << 24) | (168 << 16) | (1 << 8) | 100
+        return [
+            generate(1, _key=_TEST_KEY, _iam32=_TEST_IAM32, _time_ms=1000),
+            generate(2, _key=_TEST_KEY, _iam32=_TEST_IAM32, _time_ms=1000),
+            generate(3, _key=_TEST_KEY, _iam32=ip32, _time_ms=2000),
+        ]
+
+    def test_matches_decode(self):
+        uids = self._ids()
+        cols = decode_many(uids, verify=True, _key=_TEST_KEY)
+        for i, uid in enumerate(uids):
+            info = decode(uid, _key=_TEST_KEY)
+            self.assertEqual(cols["app_id"][i], info["app_id"])
+            self.assertEqual(cols["time_ms"][i], info["time_ms"])
+            self.assertEqual(cols["seq"][i], info["seq"])
+            self.assertEqual(cols["field32"][i], info["field32"])
+            self.assertEqual(cols["iam"][i], info["iam"])
+            self.assertIs(cols["hmac_ok"][i], info["hmac_ok"])
+
+    def test_packed_buffer(self):
+        uids = self._ids()
+        self.assertEqual(
+            decode_many(b"".join(uids), _key=_TEST_KEY),
+            decode_many(uids, _key=_TEST_KEY),
+        )
+
+    def test_iam_interned(self):
+        cols = decode_many(self._ids(), _key=_TEST_KEY)
+        self.assertIs(cols["iam"][0], cols["iam"][1])
+
+    def test_verify_off(self):
+        self.assertIsNone(decode_many(self._ids(), _key=_TEST_KEY)["hmac_ok"])
+
+    def test_tampered(self):
+        uids = self._ids()
+        uids[1] = uids[1][:15] + bytes([uids[1][15] ^ 0x01])
+        ok = decode_many(uids, verify=True, _key=_TEST_KEY)["hmac_ok"]
+        self.assertEqual(ok, [True, False, True])
+
+    def test_bad_length(self):
+        with self.assertRaises(ValueError):
+            decode_many(b"\x00" * 17, _key=_TEST_KEY)
+        with self.assertRaises(ValueError):
+            decode_many([b"\x00" * 15], _key=_TEST_KEY)
+
+
+class TestIdPool(unittest.TestCase):
+    _kw = dict(_key=_TEST_KEY, _iam32=_TEST_IAM32)
+
+    def test_take_valid_unique(self):
+        with IdPool(5, size=64, low_water=16, sequential=True, **self._kw) as pool:
+            uids = [pool.take() for _ in range(500)]
+        self.assertEqual(len(set(uids)), 500)
+        for uid in uids[:10]:
+            info = decode(uid, _key=_TEST_KEY)
+            self.assertTrue(info["hmac_ok"])
+            self.assertEqual(info["app_id"], 5)
+
+    def test_time_order(self):
+        """FIFO 取出：时间戳单调不减。"""
+        with IdPool(1, size=32, low_water=8, **self._kw) as pool:
+            times = [int.from_bytes(pool.take()[2:8], "big") for _ in range(300)]
+        self.assertEqual(times, sorted(times))
+
+    def test_underflow(self):
+        pool = IdPool(1, size=4, low_water=1, background=False, **self._kw)
+        uids = [pool.take() for _ in range(6)]
+        self.assertEqual(len(set(uids)), 6)
+        stats = pool.stats()
+        self.assertEqual(stats["underflows"], 2)
+        self.assertEqual(stats["taken"], 6)
+        self.assertEqual(pool.refill(), 4)
+        self.assertEqual(pool.stats()["available"], 4)
+
+    def test_stale_dropped(self):
+        pool = IdPool(1, size=8, low_water=1, max_staleness_ms=20, background=False, **self._kw)
+        time.sleep(0.05)
+        uid = pool.take()
+        self.assertEqual(pool.stats()["stale_dropped"], 8)
+        self.assertLessEqual(_now_ms() - int.from_bytes(uid[2:8], "big"), 20)
+
+    def test_background_refill(self):
+        with IdPool(1, size=100, low_water=50, **self._kw) as pool:
+            for _ in range(60):
+                pool.take()
+            deadline = time.monotonic() + 5
+            while pool.stats()["refills"] < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            stats = pool.stats()
+        self.assertGreaterEqual(stats["refills"], 2)
+        self.assertGreater(stats["refill_rate"], 0)
+
+    def test_concurrent_take(self):
+        import threading
+        results = []
+        with IdPool(1, size=256, low_water=64, sequential=True, **self._kw) as pool:
+            def worker():
+                results.extend(pool.take() for _ in range(500))
+            threads = [threading.Thread(target=worker) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(len(set(results)), 2000)
+
+    def test_refill_async(self):
+        import asyncio
+
+        async def main():
+            pool = IdPool(1, size=16, low_water=8, background=False, **self._kw)
+            task = asyncio.create_task(pool.refill_async())
+            uids = []
+            for _ in range(40):
+                uids.append(pool.take())
+                await asyncio.sleep(0.001)
+            pool.close()
+            await task
+            return pool, uids
+
+        pool, uids = asyncio.run(main())
+        self.assertEqual(len(set(uids)), 40)
+        self.assertGreaterEqual(pool.stats()["refills"], 2)
+
+
+class TestObsCache(unittest.TestCase):
+    def test_hits_within_same_ms(self):
+        obs_cache_clear()
+        uids = [generate(1, _key=_TEST_KEY, _iam32=_TEST_IAM32, _time_ms=_TEST_TIME) for _ in range(3)]
+        for uid in uids:
+            self.assertTrue(decode(uid, _key=_TEST_KEY)["hmac_ok"])
+        info = obs_cache_info()
+        self.assertEqual(info["misses"], 1)
+        self.assertEqual(info["hits"], 5)
+        self.assertEqual(info["size"], 1)
+
+    def test_keyed_by_key(self):
+        """不同 key 同一毫秒不能共用掩码。"""
+        obs_cache_clear()
+        uid = generate(1, _key=_TEST_KEY, _iam32=_TEST_IAM32, _time_ms=_TEST_TIME)
+        self.assertFalse(decode(uid, _key=bytes.fromhex("cd" * 32))["hmac_ok"])
+        self.assertEqual(obs_cache_info()["misses"], 2)
+
+    def test_bounded(self):
+        obs_cache_clear()
+        maxsize = obs_cache_info()["maxsize"]
+        for t in range(maxsize + 10):
+            generate(1, _key=_TEST_KEY, _iam32=_TEST_IAM32, _time_ms=t)
+        self.assertEqual(obs_cache_info()["size"], maxsize)
+
+
+class TestHmacTemplate(unittest.TestCase):
+    def test_matches_hmac_new(self):
+        for key in [_TEST_KEY, b"", b"k" * 64, b"k" * 100]:
+            tmpl = _HmacTemplate.from_key(key)
+            for data in [b"", b"\x00" * 6, b"x" * 14, b"y" * 200]:
+                self.assertEqual(tmpl.digest(data), hmac.new(key, data, hashlib.sha256).digest())
+
+    def test_prefixed(self):
+        tmpl = _HmacTemplate.from_key(_TEST_KEY).prefixed(b"app+time")
+        self.assertEqual(tmpl.digest(b"seq+iam"), hmac.new(_TEST_KEY, b"app+time" + b"seq+iam", hashlib.sha256).digest())
+
+
 class TestBase64(unittest.TestCase):
     def test_roundtrip(self):
         uid = generate(1, _key=_TEST_KEY, _iam32=_TEST_IAM32, _time_ms=_TEST_TIME)
@@ -186,6 +514,38 @@ class TestBase64(unittest.TestCase):
         self.assertEqual(b64s, sorted(b64s))
 
 
+class TestBase64Many(unittest.TestCase):
+    def _reference(self, uid):
+        """逐字符 divmod 的参考实现。"""
+        n = int.from_bytes(uid, "big")
+        chars = []
+        for _ in range(22):
+            n, r = divmod(n, 64)
+            chars.append("$0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_"[r])
+        return "".join(reversed(chars))
+
+    def test_matches_reference(self):
+        uids = [os.urandom(16) for _ in range(500)] + [b"\x00" * 16, b"\xff" * 16]
+        b64s = to_base64_many(uids)
+        self.assertEqual(b64s, [self._reference(u) for u in uids])
+        self.assertEqual(b64s, [to_base64(u) for u in uids])
+        self.assertEqual(from_base64_many(b64s), uids)
+
+    def test_packed(self):
+        uids = [os.urandom(16) for _ in range(10)]
+        buf = b"".join(uids)
+        self.assertEqual(to_base64_many(buf), to_base64_many(uids))
+        self.assertEqual(from_base64_many(to_base64_many(buf), packed=True), buf)
+
+    def test_invalid(self):
+        good = to_base64(os.urandom(16))
+        for bad in [" " + good[1:], good[:-1] + "!", good[:-1] + "é", "-" + good[1:], "4" + good[1:]]:
+            with self.assertRaises(ValueError, msg=bad):
+                from_base64_many([good, bad])
+        with self.assertRaises(ValueError):
+            from_base64_many([good[:-1]])
+
+
 class TestSort(unittest.TestCase):
     def test_sort_by_app_then_time(self):
         uid_a1_t1 = generate(1, _key=_TEST_KEY, _iam32=_TEST_IAM32, _time_ms=1000)
@@ -207,6 +567,112 @@ class TestSort(unittest.TestCase):
         self.assertEqual(times, sorted(times, reverse=True))
 
 
+class TestRangeQuery(unittest.TestCase):
+    def _unix(self, t48):
+        return (_EPOCH_MS + t48) / 1000.0
+
+    def _ids(self):
+        uids = []
+        for app in (1, 2, 3):
+            for t in (1000, 2000, 2000, 3000, 5000):
+                uids.append(generate(app, _key=_TEST_KEY, _iam32=_TEST_IAM32, _time_ms=t))
+        return uids
+
+    def test_range_bounds(self):
+        b = range_bounds(2, self._unix(1000), self._unix(3000))
+        self.assertEqual(b["min"][:2], b"\x00\x02")
+        self.assertEqual(int.from_bytes(b["min"][2:8], "big"), 1000)
+        self.assertEqual(int.from_bytes(b["max"][2:8], "big"), 3000)
+        self.assertEqual(b["min"][8:], b"\x00" * 8)
+        self.assertEqual(b["max"][8:], b"\xff" * 8)
+        self.assertEqual(from_base64(b["min_base64"]), b["min"])
+        self.assertEqual(from_base64(b["max_base64"]), b["max"])
+        for uid in self._ids():
+            inside = uid[:2] == b"\x00\x02" and 1000 <= int.from_bytes(uid[2:8], "big") <= 3000
+            self.assertEqual(b["min"] <= uid <= b["max"], inside)
+
+    def test_range_bounds_fractional(self):
+        """下界向上、上界向下取整到毫秒。"""
+        b = range_bounds(1, self._unix(1000) + 0.0004, self._unix(2000) + 0.0009)
+        self.assertEqual(int.from_bytes(b["min"][2:8], "big"), 1001)
+        self.assertEqual(int.from_bytes(b["max"][2:8], "big"), 2000)
+
+    def test_range_bounds_exact_boundary(self):
+        """恰好落在毫秒边界上、但带亚微秒浮点误差的时间不应让边界上的 ID 被漏掉。"""
+        uid = generate(1, _key=_TEST_KEY, _iam32=_TEST_IAM32, _time_ms=1000)
+        for eps in (2e-7, -2e-7):
+            b = range_bounds(1, self._unix(1000) + eps, self._unix(1000) + eps)
+            self.assertTrue(b["min"] <= uid <= b["max"], eps)
+
+    def test_index_range(self):
+        uids = self._ids()
+        idx = SortedIdIndex(list(reversed(uids)))
+        self.assertEqual(len(idx), len(uids))
+        self.assertEqual(list(idx), sorted(uids))
+        got = idx.range(2, self._unix(2000), self._unix(3000))
+        expected = sorted(u for u in uids if u[:2] == b"\x00\x02" and 2000 <= int.from_bytes(u[2:8], "big") <= 3000)
+        self.assertEqual(got, expected)
+        self.assertEqual(len(got), 3)
+
+    def test_index_by_app(self):
+        idx = SortedIdIndex(b"".join(self._ids()))
+        self.assertEqual(len(idx.by_app(3)), 5)
+        self.assertEqual(idx.by_app(9), [])
+
+    def test_index_nearest(self):
+        idx = SortedIdIndex(self._ids())
+        near = idx.nearest(1, self._unix(3900))
+        self.assertEqual(int.from_bytes(near[2:8], "big"), 3000)
+        near = idx.nearest(1, self._unix(4100))
+        self.assertEqual(int.from_bytes(near[2:8], "big"), 5000)
+        near = idx.nearest(3, self._unix(999999))
+        self.assertEqual(near[:2], b"\x00\x03")
+        self.assertEqual(int.from_bytes(near[2:8], "big"), 5000)
+        self.assertIsNone(idx.nearest(9, self._unix(1000)))
+
+
+class TestPackIds(unittest.TestCase):
+    def _ids(self):
+        uids = []
+        for app in (1, 2):
+            _seq_counter._val = 65530  # 覆盖 seq 回绕
+            for t in range(1000, 1050):
+                uids += generate_many(app, 3, sequential=True, _key=_TEST_KEY, _iam32=_TEST_IAM32, _time_ms=t)
+        return uids
+
+    def test_roundtrip_sorted(self):
+        uids = sort(self._ids())
+        buf = pack_ids(uids)
+        self.assertEqual(unpack_ids(buf), uids)
+        self.assertEqual(unpack_ids(buf, packed=True), b"".join(uids))
+        # 明显小于 base64 文本
+        self.assertLess(len(buf) * 2, sum(len(to_base64(u)) + 1 for u in uids))
+
+    def test_roundtrip_unsorted(self):
+        uids = self._ids()
+        uids = uids[::-1] + [os.urandom(16) for _ in range(20)]
+        self.assertEqual(unpack_ids(pack_ids(uids)), uids)
+        self.assertEqual(unpack_ids(pack_ids(b"".join(uids))), uids)
+
+    def test_streaming(self):
+        uids = self._ids()
+        it = iter_packed_ids(pack_ids(uids))
+        self.assertEqual(next(it), uids[0])
+        self.assertEqual(list(it), uids[1:])
+
+    def test_empty(self):
+        self.assertEqual(unpack_ids(pack_ids([])), [])
+
+    def test_corrupt(self):
+        buf = pack_ids(self._ids())
+        with self.assertRaises(ValueError):
+            unpack_ids(b"XXXX" + buf[4:])
+        with self.assertRaises(ValueError):
+            unpack_ids(buf[:-3])
+        with self.assertRaises(ValueError):
+            unpack_ids(buf + b"\x00")
+
+
 class TestVanity(unittest.TestCase):
     def test_exact_match(self):
         """搜索 'LPC' 子串 (case-insensitive)，应在合理搜索空间内找到。"""
@@ -275,6 +741,69 @@ class TestVanity(unittest.TestCase):
         self.assertLess(elapsed, 5)
         self.assertTrue(len(results) > 0)
 
+    def test_parallel_matches_serial_fuzzy(self):
+        """workers=N 的模糊候选应与串行完全一致。"""
+        kw = dict(app_id=1, target="ZZZZZZZZZZ", seconds=0.004, time_origin_ms=0,
+                  top_n=10, _key=_TEST_KEY, _iam32=_TEST_IAM32)
+        self.assertEqual(vanity(workers=2, **kw), vanity(**kw))
+
+    def test_parallel_matches_serial_exact(self):
+        """workers=N 的精确命中应与串行扫描顺序一致。"""
+        kw = dict(app_id=1, target="ab", seconds=0.004, time_origin_ms=0,
+                  top_n=5, _key=_TEST_KEY, _iam32=_TEST_IAM32)
+        serial = vanity(**kw)
+        self.assertEqual(len(serial), 5)
+        self.assertEqual(vanity(workers=3, **kw), serial)
+
+    def test_parallel_wall_timeout(self):
+        import time as _time
+        t0 = _time.monotonic()
+        results = vanity(
+            app_id=1, target="ZZZZZ", seconds=100.0, time_origin_ms=0,
+            max_wall_seconds=1, workers=2, _key=_TEST_KEY, _iam32=_TEST_IAM32,
+        )
+        self.assertLess(_time.monotonic() - t0, 5)
+        self.assertTrue(len(results) > 0)
+
+    def test_prune_matches_exhaustive(self):
+        """prune=True 的精确命中应与全量扫描一致（含跨越 HMAC 尾部的落点）。"""
+        for target, cs in [("ab", True), ("LPC", False), ("$$$F", True)]:
+            kw = dict(app_id=1, target=target, seconds=0.002, case_sensitive=cs,
+                      time_origin_ms=0, top_n=10 ** 6, _key=_TEST_KEY, _iam32=_TEST_IAM32)
+            full = [r for r in vanity(**kw) if r["score"] == len(target)]
+            self.assertEqual(vanity(prune=True, **kw), full, target)
+
+    def test_prune_fast_and_valid(self):
+        """剪枝后长 target 的大范围搜索应很快完成，结果均为合法 ID。"""
+        import time as _time
+        t0 = _time.monotonic()
+        results = vanity(
+            app_id=1, target="LePtC", seconds=60.0, time_origin_ms=0, top_n=3,
+            prune=True, _key=_TEST_KEY, _iam32=_TEST_IAM32,
+        )
+        self.assertLess(_time.monotonic() - t0, 30)
+        for r in results:
+            self.assertIn("LePtC", r["base64"])
+            self.assertTrue(decode(r["uid"], _key=_TEST_KEY)["hmac_ok"])
+
+    def test_prune_wall_timeout(self):
+        """剪枝后几乎没有候选 seq 时，max_wall_seconds 也应生效。"""
+        import time as _time
+        t0 = _time.monotonic()
+        results = vanity(
+            app_id=1, target="zzzzzzzz", seconds=600.0, time_origin_ms=0,
+            prune=True, max_wall_seconds=0.5, _key=_TEST_KEY, _iam32=_TEST_IAM32,
+        )
+        self.assertLess(_time.monotonic() - t0, 2)
+        self.assertEqual(results, [])
+
+    def test_prune_no_fuzzy(self):
+        results = vanity(
+            app_id=1, target="ZZZZZZZZZZ", seconds=0.01, time_origin_ms=0,
+            prune=True, _key=_TEST_KEY, _iam32=_TEST_IAM32,
+        )
+        self.assertEqual(results, [])
+
     def test_empty_target_raises(self):
         with self.assertRaises(ValueError):
             vanity(app_id=1, target="", _key=_TEST_KEY, _iam32=_TEST_IAM32)
@@ -297,5 +826,108 @@ class TestVanity(unittest.TestCase):
             self.assertEqual(info["app_id"], 1)
 
 
+class TestVanityMany(unittest.TestCase):
+    _kw = dict(app_id=1, seconds=0.002, time_origin_ms=0, top_n=5, _key=_TEST_KEY, _iam32=_TEST_IAM32)
+
+    def test_automaton_scores(self):
+        targets = ["lepc", "zzz", "ab"]
+        automaton = _VanityAutomaton(targets)
+        for haystack in ["$$$f$$$$$lep0zzab_x", "nothing", "zzzzab", "lepcab"]:
+            # 暴力求 target 在 haystack 中的最长连续匹配子串长度
+            expected = [
+                max((j - i for i in range(len(t)) for j in range(i + 1, len(t) + 1) if t[i:j] in haystack),
+                    default=0)
+                for t in targets
+            ]
+            self.assertEqual(automaton.scores(haystack), expected, haystack)
+            self.assertEqual(automaton.max_score(haystack), max(expected))
+
+    def test_matches_single_target(self):
+        """一次扫描的分组结果应与逐个 target 调用 vanity() 相同（精确与模糊）。"""
+        targets = ["ab", "LPC", "ZZZZZZZZZZ"]
+        results = vanity_many(targets=targets, case_sensitive=False, **self._kw)
+        self.assertEqual(list(results), targets)
+        for t in targets:
+            self.assertEqual(results[t], vanity(target=t, case_sensitive=False, **self._kw), t)
+
+    def test_regex(self):
+        results = vanity_many(targets=[], regex=r"[0-9]{3}", **self._kw)
+        self.assertEqual(len(results[r"[0-9]{3}"]), 5)
+        for r in results[r"[0-9]{3}"]:
+            self.assertRegex(r["base64"], r"[0-9]{3}")
+            self.assertEqual(r["score"], 3)
+
+    def test_parallel(self):
+        targets = ["ab", "ZZZZZZZZZZ"]
+        kw = dict(self._kw, seconds=0.004)
+        self.assertEqual(
+            vanity_many(targets=targets, workers=2, **kw),
+            vanity_many(targets=targets, **kw),
+        )
+
+    def test_prune(self):
+        targets = ["ab", "LPC"]
+        results = vanity_many(targets=targets, prune=True, case_sensitive=False, **self._kw)
+        for t in targets:
+            self.assertEqual(results[t], vanity(target=t, prune=True, case_sensitive=False, **self._kw))
+
+    def test_empty_raises(self):
+        with self.assertRaises(ValueError):
+            vanity_many(targets=[], **self._kw)
+        with self.assertRaises(ValueError):
+            vanity_many(targets=["a", ""], **self._kw)
+
+
+class TestVanityCheckpoint(unittest.TestCase):
+    _kw = dict(app_id=1, target="ZZZZZZZZZZ", seconds=0.003, time_origin_ms=0, top_n=5,
+               _key=_TEST_KEY, _iam32=_TEST_IAM32)
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "vanity.ckpt")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_interrupt_and_resume(self):
+        """中断后从断点续搜，结果应与一次跑完相同。"""
+        expected = vanity(**self._kw)
+
+        saves = []
+
+        def interrupt_after_first(*args):
+            _vanity_ckpt_save(*args)
+            saves.append(args[2])
+            raise KeyboardInterrupt
+
+        with mock.patch("crypt.atsihid._VANITY_CKPT_CHUNK_MS", 1), \
+                mock.patch("crypt.atsihid._vanity_ckpt_save", side_effect=interrupt_after_first):
+            with self.assertRaises(KeyboardInterrupt):
+                vanity(checkpoint=self.path, checkpoint_interval=0, **self._kw)
+        self.assertEqual(saves, [1])
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+        with mock.patch("crypt.atsihid._VANITY_CKPT_CHUNK_MS", 1):
+            resumed = vanity(checkpoint=self.path, resume=self.path, **self._kw)
+        self.assertEqual(resumed, expected)
+
+    def test_finished_checkpoint(self):
+        results = vanity(checkpoint=self.path, **self._kw)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["done_ms"], 3)
+        # 已完成的断点直接返回结果，不再扫描
+        with mock.patch("crypt.atsihid._vanity_candidates") as m:
+            self.assertEqual(vanity(resume=self.path, **self._kw), results)
+        m.assert_not_called()
+
+    def test_missing_resume_starts_fresh(self):
+        self.assertEqual(vanity(resume=self.path, **self._kw), vanity(**self._kw))
+
+    def test_param_mismatch(self):
+        vanity(checkpoint=self.path, **self._kw)
+        with self.assertRaises(ValueError):
+            vanity(resume=self.path, **dict(self._kw, target="ZZZZ"))
+
+
 if __name__ == "__main__":
     unittest.main()
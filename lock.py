@@ -6,31 +6,69 @@
   - release：释放锁接口，要求传入锁名称和 token；如果 token 不匹配则释放失败；支持传入 "FORCE" 强制释放。
   - with 语句支持：定义了 Lock 上下文管理器，可直接用 with 语句获取和释放锁。
   - query：查询当前系统上所有锁的接口，返回一个包含锁名称和对应 token 信息的字典。
+  - 进程内移交：同进程的线程在内存中（threading.Condition）排队，释放时锁文件直接交给下一个线程，其它进程看到的仍是文件锁。
+  - renew：续租接口，原子地把 token 中的 acquireTime 更新为当前时间；Lock(heartbeat=True) 在后台线程中定期续租。
+  - SharedLock / acquire_read / acquire_write：读写锁，多个读者可并发，写者独占。
+  - Semaphore / acquire_slot：信号量，最多 N 个持有者同时持有（每个名额一个锁 `<name>.slot<i>`）。
+  - 公平排队：acquire(..., fair=True) 在 `<name>.queue/` 目录中取号，严格按到达顺序获取锁，每个等待者只在前一个离开时醒来。
+  - AsyncLock / acquire_async / release_async：asyncio 版本，文件操作在线程池中执行，等待不阻塞事件循环。
+  - MultiLock / acquire_many / release_many：同时获取多个命名锁，按名称排序获取，遇到占用时先释放已持有的锁再等待，避免死锁。
+  - stats：按锁名称统计等待时间 / 持有时间的直方图，以及超时、过期回收、失主回收与强制清除的次数；
+    设置环境变量 LEBASE_LOCK_EVENTS 后事件同时追加到 JSONL 文件，用 `python -m lebase.lock_stats` 汇总。
+  - 后端：默认 "file"（以独占方式创建锁文件）；"flock" 在持久存在的 `<name>.flock` 文件上加 fcntl.flock，
+    持有进程一旦退出内核即释放锁，无需等待 duration 过期（仅 Unix）。通过 backend 参数或环境变量 LEBASE_LOCK_BACKEND 选择，
+    同一锁名的所有参与者须使用相同后端。
 
 锁文件存放在由 `lev.appdata / locks` 目录下，文件名即为锁名称。token 格式为：
-    name-pyFilename-pid_threadId-acquireTime-duration
+    name-pyFilename-pid_threadId-acquireTime-duration-hostname-pidStart
 其中：
   - pyFilename：通过 `getattr(sys.modules['__main__'], '__file__', sys.argv[0])` 获取当前主程序文件名
   - pid：当前进程ID
   - threadId：当前线程标识
   - acquireTime：获取锁的时间（整数秒）
   - duration：锁的生效时长（秒）
+  - hostname：持有者主机名
+  - pidStart：持有进程的启动时间（Linux 上为 /proc/<pid>/stat 的 starttime，无法获取时为 0），用于识别 PID 复用
 
-注意：在获取锁时若锁文件已存在，会每30秒轮询一次；若等待时间超过 timeout，则根据配置的超时策略采取相应操作。
+持有者与当前进程在同一主机且其进程已不存在（或 PID 已被复用）时，锁立即被回收，无需等待 duration 过期；
+旧格式（无 hostname / pidStart）的 token 只按 duration 判断。
+
+注意：在获取锁时若锁文件已存在，Linux 上通过 inotify 监视锁目录，锁文件一被删除立即重试；
+其它平台（或 inotify 不可用时）按指数退避加随机抖动重试，从几毫秒开始，单次等待不超过 retry 秒。
+若等待时间超过 timeout，则根据配置的超时策略采取相应操作。
 """
 
+import asyncio
+import bisect
 import enum
+import itertools
+import json
+import math
 import os
+import random
+import re
+import select
+import socket
+import struct
 import sys
 import threading
 import time
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 # from pathlib import Path
 from lelog.logs import log  # 日志模块，包含 log.info、log.warn、log.error
 from levar.var import lev  # lev.appdata 为一个 pathlib.Path 对象，代表读写文件的目录
 
 LOCK_DIR = lev.appdata / "locks"
 FORCE_RELEASE_TOKEN = chr(70) + chr(79) + chr(82) + chr(67) + chr(69)  # "FORCE" # 强制释放锁的标识符
+BACKEND_ENV = "LEBASE_LOCK_BACKEND"  # 未指定 backend 参数时从该环境变量读取，缺省为 "file"
+BACKENDS = ("file", "flock")
+BACKOFF_START = 0.005  # 无 inotify 时首次重试等待（秒），之后每次翻倍，上限为 retry
+EVENTS_ENV = "LEBASE_LOCK_EVENTS"  # 设置后每个锁事件以一行 JSON 追加到该文件
 
 
 # 定义超时策略的枚举类型
@@ -40,6 +78,9 @@ class TimeoutStrategy(enum.Enum):
     FORCE = 3  # 超时后强制清除原锁再获取锁
 
 
+HOSTNAME = socket.gethostname()
+
+
 # 自定义异常：获取锁超时
 class LockAcquisitionTimeoutError(Exception):
     pass
@@ -58,6 +99,23 @@ def get_lock_file_path(lockName):
     return LOCK_DIR / f"{lockName}.lock"
 
 
+# 工具函数：根据锁名称获取 flock 后端锁文件的完整路径（文件持久存在，持有期间写入 token）
+def get_flock_file_path(lockName):
+    if not LOCK_DIR.exists():
+        LOCK_DIR.mkdir(parents=True, exist_ok=True)
+    return LOCK_DIR / f"{lockName}.flock"
+
+
+# 工具函数：确定使用的后端
+def resolve_backend(backend=None):
+    backend = backend or os.environ.get(BACKEND_ENV) or "file"
+    if backend not in BACKENDS:
+        raise ValueError("未知的锁后端：{}，可选：{}".format(backend, ", ".join(BACKENDS)))
+    if backend == "flock" and fcntl is None:
+        raise ValueError("当前平台不支持 flock 后端")
+    return backend
+
+
 # 工具函数：解析 token，返回字典格式的信息
 def parse_token(token):
     """
@@ -67,7 +125,9 @@ def parse_token(token):
          "pyFilename": 主程序文件名,
          "pidThread": "pid_threadId",
          "acquireTime": 获取锁时间 (int),
-         "duration": 锁有效时长 (int)
+         "duration": 锁有效时长 (int),
+         "hostname": 持有者主机名（旧格式 token 为 None）,
+         "pidStart": 持有进程启动时间 (int，旧格式 token 为 None)
       }
     """
     parts = token.split("-")
@@ -77,12 +137,18 @@ def parse_token(token):
         pidThread = parts[2]
         acquireTime = int(parts[3])
         duration = int(parts[4])
+        hostname, pidStart = None, None
+        if len(parts) >= 7:
+            hostname = "-".join(parts[5:-1])  # 主机名本身可能含 "-"
+            pidStart = int(parts[-1])
         return {
             "name": parts[0],
             "pyFilename": parts[1],
             "pidThread": pidThread,
             "acquireTime": acquireTime,
             "duration": duration,
+            "hostname": hostname,
+            "pidStart": pidStart,
         }
     except Exception as e:
         log.error("解析 token 失败：{}，错误：{}".format(token, e))
@@ -99,12 +165,111 @@ def is_lock_expired(token):
     return time.time() > expireTime
 
 
+# 工具函数：读取 /proc/<pid>/stat 中 comm 之后的字段（第 3 个字段 state 起），无法读取时返回 None
+def _read_proc_stat(pid):
+    try:
+        with open("/proc/{}/stat".format(pid), "rb") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # 第 2 个字段 comm 可能含空格和括号，从最后一个 ")" 之后开始数
+    fields = stat[stat.rfind(b")") + 2:].split()
+    return fields if len(fields) > 19 else None
+
+
+# 工具函数：获取进程启动时间（Linux 上为自开机起的时钟滴答数），无法获取时返回 None
+def get_process_start_time(pid):
+    fields = _read_proc_stat(pid)
+    return int(fields[19]) if fields else None  # starttime 是第 22 个字段
+
+
+def _reset_pid_start():
+    # fork 出的子进程须重新读取自己的启动时间，否则 token 中沿用父进程的值，会被其它进程误判为 PID 复用
+    global _PID_START
+    _PID_START = get_process_start_time(os.getpid()) or 0
+
+
+_reset_pid_start()
+if hasattr(os, "register_at_fork"):  # Windows 上没有 fork
+    os.register_at_fork(after_in_child=_reset_pid_start)
+
+
+def _local_owner_pid(token):
+    """token 的持有者若是本机的其它进程，返回其 pid，否则返回 None"""
+    parsed = parse_token(token) if token else None
+    if not parsed or parsed["hostname"] != HOSTNAME:
+        return None
+    try:
+        pid = int(parsed["pidThread"].split("_")[0])
+    except ValueError:
+        return None
+    return None if pid == os.getpid() else pid
+
+
+# 判断锁的持有进程是否已不存在（仅能判断本机进程；Windows 上 os.kill 会终止进程，因此不检查）
+def is_lock_owner_dead(token):
+    if os.name == "nt":
+        return False
+    pid = _local_owner_pid(token)
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass  # 进程存在，只是属于其它用户
+    fields = _read_proc_stat(pid)
+    if fields is None:
+        return False
+    if fields[0] == b"Z":
+        return True  # 已退出、尚未被父进程回收
+    pidStart = parse_token(token)["pidStart"]
+    if pidStart and int(fields[19]) != pidStart:
+        return True  # PID 已被其它进程复用
+    return False
+
+
 # 写 token 到文件
 def write_token_to_file(lockFile, token):
     with open(lockFile, "w", encoding="utf-8") as f:
         f.write(token)
 
 
+# 工具函数：锁文件仍为 oldToken 时原子改写为 newToken（先写临时文件再 rename，其它进程不会读到半截内容），返回是否改写
+# 其它进程只回收过期（或持有进程已不存在）的锁，因此 oldToken 已过期时直接放弃；
+# 新 token 先写入临时文件，rename 前再确认一次文件内容，把比较与改写之间的窗口缩到最小
+def replace_token_if_current(lockFile, oldToken, newToken):
+    if is_lock_expired(oldToken) or read_token_from_file(lockFile) != oldToken:
+        return False
+    tmpFile = lockFile.with_name("{}.{}_{}.tmp".format(lockFile.name, os.getpid(), threading.get_ident()))
+    write_token_to_file(tmpFile, newToken)
+    try:
+        if is_lock_expired(oldToken) or read_token_from_file(lockFile) != oldToken:
+            return False
+        os.replace(tmpFile, lockFile)
+        return True
+    finally:
+        if tmpFile.exists():
+            os.remove(tmpFile)
+
+
+# 以独占方式创建文件并写入 token（若文件已存在抛出 FileExistsError）
+# 先写临时文件再硬链接到目标路径，其它进程不会读到刚创建、尚未写入的空文件（空 token 会被当作失效锁删除）
+def create_file_exclusive(path, token):
+    tmpFile = path.with_name("{}.{}_{}.tmp".format(path.name, os.getpid(), threading.get_ident()))
+    write_token_to_file(tmpFile, token)
+    try:
+        os.link(tmpFile, path)
+    except FileExistsError:
+        raise
+    except OSError:  # 文件系统不支持硬链接
+        with open(path, "x", encoding="utf-8") as f:
+            f.write(token)
+    finally:
+        os.remove(tmpFile)
+
+
 # 从文件读取 token
 def read_token_from_file(lockFile):
     try:
@@ -116,6 +281,121 @@ def read_token_from_file(lockFile):
         return None
 
 
+# inotify 常量（见 <sys/inotify.h>）
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len；其后紧跟 len 字节的文件名
+
+
+def _load_inotify():
+    """通过 ctypes 加载 libc 的 inotify 接口；非 Linux 或加载失败时返回 None。"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_inotify = _load_inotify()
+
+
+class _LockDirWatcher:
+    """
+    监视 LOCK_DIR 中锁文件的删除（release / 过期清理 / FORCE）
+
+    Linux 上使用 inotify，锁文件一被删除立即唤醒；否则按指数退避加抖动睡眠。
+    必须在检查锁文件之前创建，才能保证检查之后发生的删除不会被错过。
+    flock 后端改为监视 IN_CLOSE_WRITE：持有者释放或进程退出时都会关闭文件。
+    """
+
+    def __init__(self, directory, retry, mask=_IN_DELETE | _IN_MOVED_FROM):
+        self.retry = retry
+        self.backoff = BACKOFF_START
+        self.fd = None
+        if _inotify is None:
+            return
+        fd = _inotify.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            return
+        if _inotify.inotify_add_watch(fd, os.fsencode(str(directory)), mask) < 0:
+            os.close(fd)
+            return
+        self.fd = fd
+
+    def wait(self, fileName, timeout, ownerPid=None):
+        """
+        等待 fileName 被删除或移走（或 mask 指定的其它事件），最多 timeout 秒
+
+        参数:
+          fileName: 文件名，或文件名的 tuple（其中任意一个出现事件即唤醒）
+          ownerPid: 本机持有进程的 pid；支持 pidfd 时该进程退出也会唤醒
+
+        返回:
+          观察到该事件（或持有进程退出）返回 True；超时（或退避睡眠结束）返回 False
+        """
+        if timeout <= 0:
+            return False
+        if self.fd is None:
+            # 全抖动：在 [backoff/2, backoff] 内随机，避免多个等待者同时醒来
+            time.sleep(min(random.uniform(self.backoff / 2, self.backoff), timeout))
+            self.backoff = min(self.backoff * 2, self.retry)
+            return False
+
+        pidFd = None
+        if ownerPid is not None and hasattr(os, "pidfd_open"):
+            try:
+                pidFd = os.pidfd_open(ownerPid)
+            except ProcessLookupError:
+                return True
+            except OSError:
+                pidFd = None
+        try:
+            names = (fileName,) if isinstance(fileName, str) else fileName
+            return self._wait_inotify({os.fsencode(n) for n in names}, timeout, pidFd)
+        finally:
+            if pidFd is not None:
+                os.close(pidFd)
+
+    def _wait_inotify(self, targets, timeout, pidFd):
+        fds = [self.fd] if pidFd is None else [self.fd, pidFd]
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            ready, _, _ = select.select(fds, [], [], remaining)
+            if not ready:
+                return False
+            if pidFd is not None and pidFd in ready:
+                return True  # 持有进程已退出
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                continue
+            offset = 0
+            while offset + _INOTIFY_EVENT.size <= len(data):
+                _, _, _, nameLen = _INOTIFY_EVENT.unpack_from(data, offset)
+                start = offset + _INOTIFY_EVENT.size
+                offset = start + nameLen
+                if data[start:offset].rstrip(b"\0") in targets:
+                    return True
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
 def _handle_timeout(name, lockFile, timeoutStrategy):
     """
     处理获取锁超时的情况
@@ -136,9 +416,12 @@ def _handle_timeout(name, lockFile, timeoutStrategy):
     elif timeoutStrategy == TimeoutStrategy.FORCE:
         # 强制清除锁文件
         if lockFile.exists():
+            forcedToken = read_token_from_file(lockFile)
             try:
                 os.remove(lockFile)
                 log.warning("超时后强制清除锁：{}".format(name))
+                _record(name, "forced")
+                _drop_hold(forcedToken)
             except Exception as e:
                 log.error("强制清除锁失败：{}，错误：{}".format(name, e))
                 raise LockAcquisitionTimeoutError("强制清除锁失败: {}".format(name)) from None
@@ -146,6 +429,14 @@ def _handle_timeout(name, lockFile, timeoutStrategy):
         return True  # 表示需要继续尝试获取锁
 
 
+def _make_token(name, currentPyFile, currentPid, currentThreadId, duration):
+    # 构造 token 格式：name-pyFilename-pid_threadId-acquireTime-duration-hostname-pidStart
+    acquireTime = int(time.time())
+    return "{}-{}-{}_{}-{}-{}-{}-{}".format(
+        name, currentPyFile, currentPid, currentThreadId, acquireTime, duration, HOSTNAME, _PID_START
+    )
+
+
 def _create_lock_file(name, lockFile, currentPyFile, currentPid, currentThreadId, duration):
     """
     创建锁文件
@@ -161,12 +452,9 @@ def _create_lock_file(name, lockFile, currentPyFile, currentPid, currentThreadId
     返回:
       成功创建锁文件后返回token
     """
-    # 构造 token 格式：name-pyFilename-pid_threadId-acquireTime-duration
-    acquireTime = int(time.time())
-    token = "{}-{}-{}_{}-{}-{}".format(name, currentPyFile, currentPid, currentThreadId, acquireTime, duration)
+    token = _make_token(name, currentPyFile, currentPid, currentThreadId, duration)
     # 尝试以独占方式创建文件（若文件已存在会抛出 FileExistsError）
-    with open(lockFile, "x", encoding="utf-8") as f:
-        f.write(token)
+    create_file_exclusive(lockFile, token)
     log.debug("成功获取锁：{}".format(token))
     return token
 
@@ -198,16 +486,31 @@ def _handle_existing_lock(name, lockFile):
         try:
             os.remove(lockFile)
             log.success("删除过期锁成功：{}".format(name))
+            _record(name, "expired")
+            _drop_hold(existingToken)
             return True  # 锁文件已删除
         except Exception as e:
             log.error("删除过期锁失败：{}，错误：{}".format(name, e))
             return False  # 删除失败
+    elif is_lock_owner_dead(existingToken):
+        log.warning("锁的持有进程已不存在，准备删除旧锁：{}".format(existingToken))
+        try:
+            os.remove(lockFile)
+            log.success("删除失主锁成功：{}".format(name))
+            _record(name, "owner_dead")
+            _drop_hold(existingToken)
+            return True  # 锁文件已删除
+        except Exception as e:
+            log.error("删除失主锁失败：{}，错误：{}".format(name, e))
+            return False  # 删除失败
     else:
         log.warning("锁 {} 当前被占用，token信息：{}".format(name, existingToken))
         return False  # 锁未过期且未删除
 
 
-def acquire(name, duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RAISE, retry=30):
+def acquire(
+    name, duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RAISE, retry=30, backend=None, fair=False
+):
     """
     获取锁的接口
 
@@ -216,57 +519,158 @@ def acquire(name, duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RA
       duration: 锁的有效时长（秒），默认为600秒
       timeout: 等待获取锁的超时时间（秒），默认为3600秒
       timeoutStrategy: 超时策略，枚举类型 TimeoutStrategy，有 RAISE、GIVEUP、FORCE 三种取值
+      retry: 锁被占用时单次等待的上限（秒）；锁文件被删除时会提前醒来
+      backend: "file" 或 "flock"，缺省取环境变量 LEBASE_LOCK_BACKEND，再缺省为 "file"
+      fair: True 时在 `<name>.queue/` 中取号排队，按到达顺序获取锁（同进程的线程也各自排队）；
+            超时策略为 FORCE 时插队直接抢锁
 
     返回:
-      成功获取锁后返回 token 字符串，格式为 "name-pyFilename-pid_threadId-acquireTime-duration"
+      成功获取锁后返回 token 字符串，格式为 "name-pyFilename-pid_threadId-acquireTime-duration-hostname-pidStart"
       若获取失败：若超时策略为 GIVEUP，则返回 None；若超时策略为 RAISE，则抛出异常
     """
-    startTime = time.time()
+    return _timed_acquire(name, _acquire, name, duration, time.time(), timeout, timeoutStrategy, retry, backend, fair)
+
+
+def _acquire(name, duration, startTime, timeout, timeoutStrategy, retry, backend, fair):
+    """acquire 的实现（不计入统计），参数与返回值同 acquire"""
+    backend = resolve_backend(backend)
+    if fair:
+        return _acquire_fair(name, duration, startTime, timeout, timeoutStrategy, retry, backend)
+    if backend == "flock":
+        return _acquire_flock(name, duration, startTime, timeout, timeoutStrategy, retry)
     lockFile = get_lock_file_path(name)
+    if not _local_handoff:
+        return _acquire_file(name, lockFile, duration, startTime, timeout, timeoutStrategy, retry)
+
+    state = _get_local_state(name)
+    with state.cond:
+        state.waiters += 1
+        try:
+            # 同进程内已有线程持有（或正在获取）该锁时，在内存中排队；持有者的锁过期后不再等待
+            while state.busy and not state.handoff:
+                remainingTime = timeout - (time.time() - startTime)
+                if state.token is not None:
+                    if is_lock_expired(state.token):
+                        break
+                    parsed = parse_token(state.token)
+                    remainingTime = min(remainingTime, parsed["acquireTime"] + parsed["duration"] - time.time())
+                if remainingTime <= 0:
+                    break
+                state.cond.wait(remainingTime)
+            if state.handoff:
+                state.handoff = False
+                token = _take_handoff(name, lockFile, state.token, duration)
+                if token is not None:
+                    state.token = token
+                    return token
+                # 文件锁已不属于本进程（过期被其它进程回收等），退回文件路径
+            elif state.busy and not (state.token is not None and is_lock_expired(state.token)):
+                result = _handle_timeout(name, lockFile, timeoutStrategy)
+                if result is None:  # GIVEUP策略
+                    return None
+                # FORCE策略：原持有线程的 token 随文件一并失效
+            state.busy = True
+            state.token = None
+        finally:
+            state.waiters -= 1
+
+    token = None
+    try:
+        token = _acquire_file(name, lockFile, duration, startTime, timeout, timeoutStrategy, retry)
+    finally:
+        with state.cond:
+            if token is None:
+                state.busy = False
+                state.cond.notify()
+            else:
+                state.token = token
+    return token
+
+
+def _acquire_file(name, lockFile, duration, startTime, timeout, timeoutStrategy, retry):
+    """通过锁文件在进程间获取锁，参数与返回值同 acquire"""
     currentPyFile = get_py_filename()
     currentPid = os.getpid()
     currentThreadId = threading.get_ident()
+    watcher = None
 
-    while True:
-        currentTime = time.time()
-        if currentTime - startTime >= timeout:
-            result = _handle_timeout(name, lockFile, timeoutStrategy)
-            if result is None:  # GIVEUP策略
-                return None
-            elif result is True:  # FORCE策略成功，继续尝试获取锁
-                pass  # 继续循环，立即尝试获取锁
-        try:
-            token = _create_lock_file(name, lockFile, currentPyFile, currentPid, currentThreadId, duration)
-            return token
-        except FileExistsError:
-            # 锁文件已存在，处理已存在的锁文件
-            lock_deleted = _handle_existing_lock(name, lockFile)
-            if not lock_deleted:
-                # 如果锁未被删除，则等待后重试
-                sleepTime = retry
-                remainingTime = timeout - (time.time() - startTime)
-                sleepTime = min(sleepTime, remainingTime)
-                if sleepTime > 0:
-                    time.sleep(sleepTime)
-                else:
+    try:
+        while True:
+            currentTime = time.time()
+            if currentTime - startTime >= timeout:
+                result = _handle_timeout(name, lockFile, timeoutStrategy)
+                if result is None:  # GIVEUP策略
+                    return None
+                elif result is True:  # FORCE策略成功，继续尝试获取锁
+                    pass  # 继续循环，立即尝试获取锁
+            try:
+                token = _create_lock_file(name, lockFile, currentPyFile, currentPid, currentThreadId, duration)
+                return token
+            except FileExistsError:
+                if watcher is None:
+                    # 首次遇到占用：先开始监视再重试，避免错过两次检查之间的释放
+                    watcher = _LockDirWatcher(LOCK_DIR, retry)
                     continue
+                # 锁文件已存在，处理已存在的锁文件
+                lock_deleted = _handle_existing_lock(name, lockFile)
+                if not lock_deleted:
+                    # 如果锁未被删除，则等待锁文件被删除或持有进程退出（最多 retry 秒）后重试
+                    remainingTime = timeout - (time.time() - startTime)
+                    ownerPid = _local_owner_pid(read_token_from_file(lockFile)) if watcher.fd is not None else None
+                    watcher.wait(lockFile.name, min(retry, remainingTime), ownerPid)
+    finally:
+        if watcher is not None:
+            watcher.close()
 
 
-def release(name, token):
+def release(name, token, backend=None):
     """
     释放锁的接口
 
     参数:
       name: 锁的名字
       token: 获取锁时返回的 token；如果传入 "FORCE" 则表示强制释放锁
+      backend: 同 acquire；仅 FORCE 释放时需要据此找到锁文件，普通释放按 token 自动识别
+
+    同进程内有线程在等待该锁时，文件锁不删除，直接交给下一个等待线程。
     """
+    _record_release(token)
+    if token in _flockFds:
+        _release_flock(name, token)
+        return
+    if token == FORCE_RELEASE_TOKEN and resolve_backend(backend) == "flock":
+        _release_file(name, get_flock_file_path(name), token)
+        return
     lockFile = get_lock_file_path(name)
+    state = _localLocks.get(name)
+    if state is not None:
+        with state.cond:
+            if token == FORCE_RELEASE_TOKEN or (state.busy and state.token == token):
+                if token != FORCE_RELEASE_TOKEN and state.waiters > 0:
+                    state.handoff = True
+                    state.cond.notify()
+                    log.debug("锁在进程内移交：{}".format(token))
+                    return
+                _release_file(name, lockFile, token)
+                state.busy = False
+                state.handoff = False
+                state.token = None
+                state.cond.notify()
+                return
+    _release_file(name, lockFile, token)
+
+
+def _release_file(name, lockFile, token):
+    """删除锁文件以释放进程间的锁"""
     if token == FORCE_RELEASE_TOKEN:
         log.warning("使用 FORCE 标识强制释放锁：{}".format(name))
         if lockFile.exists():
+            forcedToken = read_token_from_file(lockFile)
             try:
                 os.remove(lockFile)
                 log.success("强制释放锁成功：{}".format(name))
+                _record(name, "forced")
+                _drop_hold(forcedToken)
             except Exception as e:
                 log.error("强制释放锁失败：{}，错误：{}".format(name, e))
         else:
@@ -288,20 +692,525 @@ def release(name, token):
         log.error("释放锁失败：{}，错误：{}".format(token, e))
 
 
+# ── 进程内排队与移交 ──
+# 同进程的线程先在 threading.Condition 上排队，只有队首线程去竞争锁文件；
+# 释放时若还有同进程线程在等，锁文件保留，只原子地改写 token 后直接交给下一个线程。
+_local_handoff = True  # 关闭后每个线程都直接竞争锁文件（用于基准对比）
+
+
+class _LocalLockState:
+    __slots__ = ("cond", "busy", "handoff", "token", "waiters")
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.busy = False  # 本进程是否有线程持有或正在获取该锁
+        self.handoff = False  # 持有者已释放，等待某个排队线程接手
+        self.token = None  # 本进程当前持有的 token
+        self.waiters = 0
+
+
+_localLocks = {}
+_localLocksGuard = threading.Lock()
+
+
+def _get_local_state(name):
+    with _localLocksGuard:
+        state = _localLocks.get(name)
+        if state is None:
+            state = _localLocks[name] = _LocalLockState()
+        return state
+
+
+def _take_handoff(name, lockFile, oldToken, duration):
+    """
+    接手同进程上一个持有者的文件锁：确认 oldToken 未过期且锁文件仍是 oldToken 后原子改写为新 token
+
+    返回:
+      新 token；oldToken 已过期、文件锁已不属于本进程或改写失败时返回 None
+    """
+    token = _make_token(name, get_py_filename(), os.getpid(), threading.get_ident(), duration)
+    try:
+        replaced = replace_token_if_current(lockFile, oldToken, token)
+    except OSError as e:
+        log.error("移交锁时改写 token 失败：{}，错误：{}".format(name, e))
+        return None
+    if not replaced:
+        log.warning("移交时锁已过期或已不属于本进程：{}".format(name))
+        return None
+    log.debug("成功获取锁（进程内移交）：{}".format(token))
+    return token
+
+
+# ── flock 后端 ──
+# 锁文件持久存在，持有期间 fd 保持打开并在文件中写入 token；释放时清空内容、解锁并关闭。
+_flockFds = {}  # token -> 持有该锁的 fd
+_flockGuard = threading.Lock()
+
+
+def _acquire_flock(name, duration, startTime, timeout, timeoutStrategy, retry):
+    """通过 fcntl.flock 获取锁，参数与返回值同 acquire"""
+    return _acquire_any([name], duration, startTime, timeout, timeoutStrategy, retry, "flock")
+
+
+def _acquire_any(names, duration, startTime, timeout, timeoutStrategy, retry, backend, sharedName=None):
+    """
+    获取 names 中任意一个空闲的锁（不经过进程内排队），参数与返回值同 acquire
+
+    超时策略为 FORCE 时强制清除 names[0]；
+    sharedName 仅用于 flock 后端：加 LOCK_SH、不写入 token，token 中的锁名称取 sharedName（各读者唯一）
+    """
+    useFlock = backend == "flock"
+    lockFiles = [get_flock_file_path(n) if useFlock else get_lock_file_path(n) for n in names]
+    fds = {}  # flock 后端：等待期间 fd 保持打开，避免反复关闭产生 IN_CLOSE_WRITE 唤醒其它等待者
+    watcher = None
+    try:
+        while True:
+            if time.time() - startTime >= timeout:
+                result = _handle_timeout(names[0], lockFiles[0], timeoutStrategy)
+                if result is None:  # GIVEUP策略
+                    return None
+                if 0 in fds:  # FORCE策略已删除旧文件，重新打开
+                    os.close(fds.pop(0))
+            for i, (name, lockFile) in enumerate(zip(names, lockFiles)):
+                if useFlock:
+                    token = _try_flock(sharedName or name, lockFile, fds, i, duration, sharedName is not None)
+                else:
+                    token = _try_lock_file(name, lockFile, duration)
+                if token is not None:
+                    return token
+            if watcher is None:
+                # 首次遇到占用：先开始监视再重试，避免错过两次检查之间的释放
+                watcher = _LockDirWatcher(LOCK_DIR, retry, _IN_CLOSE_WRITE if useFlock else _IN_DELETE | _IN_MOVED_FROM)
+                continue
+            remainingTime = timeout - (time.time() - startTime)
+            watcher.wait(tuple(f.name for f in lockFiles), min(retry, remainingTime))
+    finally:
+        for fd in fds.values():
+            os.close(fd)
+        if watcher is not None:
+            watcher.close()
+
+
+def _try_lock_file(name, lockFile, duration):
+    """不等待地尝试创建锁文件（会先清理过期 / 失主的旧锁），成功返回 token，被占用返回 None"""
+    for _ in range(2):
+        try:
+            return _create_lock_file(name, lockFile, get_py_filename(), os.getpid(), threading.get_ident(), duration)
+        except FileExistsError:
+            if not _handle_existing_lock(name, lockFile):
+                return None
+    return None
+
+
+def _try_flock(tokenName, lockFile, fds, key, duration, shared=False):
+    """不等待地尝试在 fds[key]（缺省时打开 lockFile）上加 flock，成功返回 token，被占用返回 None"""
+    while True:
+        fd = fds.get(key)
+        if fd is None:
+            fd = fds[key] = os.open(lockFile, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        # 等待期间文件可能被 FORCE 删除或替换，确认 fd 仍对应当前路径
+        try:
+            sameFile = os.fstat(fd).st_ino == os.stat(lockFile).st_ino
+        except FileNotFoundError:
+            sameFile = False
+        del fds[key]
+        if not sameFile:
+            os.close(fd)
+            continue
+        token = _make_token(tokenName, get_py_filename(), os.getpid(), threading.get_ident(), duration)
+        if not shared:
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, token.encode("utf-8"), 0)
+        with _flockGuard:
+            _flockFds[token] = fd
+        log.debug("成功获取锁：{}".format(token))
+        return token
+
+
+def _release_flock(name, token):
+    """清空 token（共享锁不写 token，跳过）、解锁并关闭 fd"""
+    with _flockGuard:
+        fd = _flockFds.pop(token, None)
+    if fd is None:
+        log.error("token 不匹配，无法释放锁：{}，传入 token：{}".format(name, token))
+        return
+    try:
+        if os.pread(fd, len(token), 0) == token.encode("utf-8"):
+            os.ftruncate(fd, 0)
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+    log.debug("成功释放锁：{}".format(token))
+
+
+def _read_flock_token(lockFile):
+    """flock 锁文件当前被持有时返回其 token，否则返回 None"""
+    if fcntl is None:
+        return None
+    # 以写方式打开：关闭时产生 IN_CLOSE_WRITE，不会让等待者错过这次短暂的加锁
+    fd = os.open(lockFile, os.O_RDWR)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return os.read(fd, 4096).decode("utf-8").strip() or None
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        return None
+    finally:
+        os.close(fd)
+
+
+# ── 公平排队 ──
+# 等待者在 `<name>.queue/` 中创建以取号时刻命名的票据文件（内容为等待者的 token），只监视排在自己前面的那一张票据；
+# 排到队首后才去竞争锁文件，拿到锁即删除自己的票据，唤醒下一位。
+# 票据名为 "<20 位 time_ns>-<pid>_<threadId>"，不依赖目录中已有的票据，先离开的票据不会让后来者排到已在排队者之前
+# （跨进程的先后取决于系统时钟，时钟回拨期间的到达顺序可能不准）。
+def get_queue_dir_path(lockName):
+    queueDir = LOCK_DIR / f"{lockName}.queue"
+    if not queueDir.exists():
+        queueDir.mkdir(parents=True, exist_ok=True)
+    return queueDir
+
+
+_TICKET_RE = re.compile(r"^\d{20}-\d+_\d+$")
+_lastTicketNs = 0
+_ticketGuard = threading.Lock()
+
+
+def _queue_tickets(queueDir):
+    # 时间戳部分定长，字符串顺序即取号顺序（跳过 create_file_exclusive 的临时文件）
+    return sorted(f.name for f in queueDir.iterdir() if _TICKET_RE.match(f.name))
+
+
+def _take_ticket(queueDir, token):
+    """在队尾取号，返回票据文件路径"""
+    global _lastTicketNs
+    while True:
+        with _ticketGuard:  # 同进程内严格递增
+            _lastTicketNs = max(time.time_ns(), _lastTicketNs + 1)
+            ticketNs = _lastTicketNs
+        ticket = queueDir / "{:020d}-{}_{}".format(ticketNs, os.getpid(), threading.get_ident())
+        try:
+            create_file_exclusive(ticket, token)
+            return ticket
+        except FileExistsError:
+            continue  # 同名票据已存在（极少见，如 PID 复用），重取
+
+
+def _queue_predecessor(queueDir, ticket):
+    """
+    返回排在 ticket 前面的最后一张有效票据及其 token；已排到队首时返回 (None, None)
+
+    持有者已过期或退出的票据会被清理
+    """
+    while True:
+        earlier = [t for t in _queue_tickets(queueDir) if t < ticket.name]
+        if not earlier:
+            return None, None
+        predecessor = queueDir / earlier[-1]
+        try:
+            token = predecessor.read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            continue
+        if is_lock_expired(token) or is_lock_owner_dead(token):
+            log.warning("清理失效的排队票据：{}".format(token))
+            try:
+                os.remove(predecessor)
+            except FileNotFoundError:
+                pass
+            continue
+        return predecessor, token
+
+
+def _acquire_fair(name, duration, startTime, timeout, timeoutStrategy, retry, backend):
+    """按到达顺序获取锁，参数与返回值同 acquire"""
+    useFlock = backend == "flock"
+    lockFile = get_flock_file_path(name) if useFlock else get_lock_file_path(name)
+    queueDir = get_queue_dir_path(name)
+    # 票据的有效期取等待超时，等待者超时后必然离开
+    ticketToken = _make_token(
+        name, get_py_filename(), os.getpid(), threading.get_ident(), int(min(timeout, 10**9)) + 1
+    )
+    ticket = _take_ticket(queueDir, ticketToken)
+    fds = {}
+    queueWatcher = None
+    lockWatcher = None
+    try:
+        while True:
+            isHead = False
+            if time.time() - startTime >= timeout:
+                if _handle_timeout(name, lockFile, timeoutStrategy) is None:  # GIVEUP策略
+                    return None
+                if 0 in fds:  # FORCE策略已删除旧文件，重新打开
+                    os.close(fds.pop(0))
+                isHead = True  # FORCE策略：插队直接抢锁
+            else:
+                predecessor, predecessorToken = _queue_predecessor(queueDir, ticket)
+                if predecessor is not None:
+                    if queueWatcher is None:
+                        # 先开始监视再重新检查，避免错过两次检查之间的离开
+                        queueWatcher = _LockDirWatcher(queueDir, retry)
+                        continue
+                    remainingTime = timeout - (time.time() - startTime)
+                    queueWatcher.wait(predecessor.name, min(retry, remainingTime), _local_owner_pid(predecessorToken))
+                    continue
+                isHead = True
+            if isHead:
+                if useFlock:
+                    token = _try_flock(name, lockFile, fds, 0, duration)
+                else:
+                    token = _try_lock_file(name, lockFile, duration)
+                if token is not None:
+                    return token
+                if lockWatcher is None:
+                    lockWatcher = _LockDirWatcher(LOCK_DIR, retry, _IN_CLOSE_WRITE if useFlock else _IN_DELETE | _IN_MOVED_FROM)
+                    continue
+                remainingTime = timeout - (time.time() - startTime)
+                ownerPid = None if useFlock else _local_owner_pid(read_token_from_file(lockFile))
+                lockWatcher.wait(lockFile.name, min(retry, max(remainingTime, 0)), ownerPid)
+    finally:
+        # 拿到锁、放弃或出错都离开队列，唤醒下一位
+        try:
+            os.remove(ticket)
+        except FileNotFoundError:
+            pass
+        for fd in fds.values():
+            os.close(fd)
+        for watcher in (queueWatcher, lockWatcher):
+            if watcher is not None:
+                watcher.close()
+
+
+# ── 续租 ──
+def _renewed_token(token):
+    # 只替换 acquireTime 字段，其余（包括获取锁的线程标识）保持不变
+    parts = token.split("-")
+    parts[3] = str(int(time.time()))
+    return "-".join(parts)
+
+
+def renew(name, token, backend=None):
+    """
+    续租接口：把锁的 acquireTime 更新为当前时间（写临时文件再 rename，原子替换）
+
+    参数:
+      name: 锁的名字
+      token: 当前持有的 token
+      backend: 同 release，普通续租按 token 自动识别
+
+    返回:
+      续租成功返回新的 token（之后释放 / 续租须使用新 token）；token 已过期，或锁已不属于该 token（被回收、被强制释放等）时返回 None
+    """
+    if parse_token(token) is None:
+        log.error("token 无效，无法续租：{}".format(token))
+        return None
+    newToken = _renewed_token(token)
+
+    with _flockGuard:
+        fd = _flockFds.pop(token, None)
+        if fd is not None:
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, newToken.encode("utf-8"), 0)
+            _flockFds[newToken] = fd
+    if fd is not None:
+        _move_hold(token, newToken)
+        log.debug("续租成功：{}".format(newToken))
+        return newToken
+
+    lockFile = get_lock_file_path(name)
+    state = _localLocks.get(name)
+    if state is None:
+        if _renew_file(name, lockFile, token, newToken) is None:
+            return None
+    else:
+        # 与进程内移交互斥，并同步进程内记录的 token
+        with state.cond:
+            if _renew_file(name, lockFile, token, newToken) is None:
+                return None
+            if state.token == token:
+                state.token = newToken
+    _move_hold(token, newToken)
+    return newToken
+
+
+def _renew_file(name, lockFile, token, newToken):
+    # 已过期的 token 不再续租：锁可能正被其它进程回收，改写会覆盖新持有者的锁
+    try:
+        replaced = replace_token_if_current(lockFile, token, newToken)
+    except OSError as e:
+        log.error("续租时改写 token 失败：{}，错误：{}".format(name, e))
+        return None
+    if not replaced:
+        log.warning("续租失败，锁已过期或已不属于该 token：{}".format(token))
+        return None
+    log.debug("续租成功：{}".format(newToken))
+    return newToken
+
+
+# ── 读写锁与信号量 ──
+_readerSeq = itertools.count()
+
+
+def _reader_prefix(name):
+    return "{}.reader.".format(name)
+
+
+def _release_by_token(name, token):
+    # 读者标记锁 / 信号量名额的锁名称记录在 token 中
+    _record_release(token)
+    if token in _flockFds:
+        _release_flock(name, token)
+        return
+    parsed = parse_token(token)
+    if not parsed:
+        log.error("token 无效，无法释放锁：{}，传入 token：{}".format(name, token))
+        return
+    release(parsed["name"], token)
+
+
+def acquire_read(name, duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RAISE, retry=30, backend=None):
+    """
+    获取读锁（共享锁）：多个读者可同时持有，与写者互斥
+
+    file 后端：先短暂获取名为 name 的排他锁（写者持有或等待时在此排队），
+    再创建本读者独有的标记锁 `<name>.reader.<pid>_<threadId>_<序号>`，随即释放 name。
+    flock 后端：在 `<name>.flock` 上加 LOCK_SH（读者持续到来时写者可能一直等待），token 中的锁名称同样取上述读者名。
+
+    参数与返回值同 acquire；返回的 token 中锁名称为读者标记锁的名称，用 release_read 释放
+    """
+    return _timed_acquire(name, _acquire_read, name, duration, timeout, timeoutStrategy, retry, backend)
+
+
+def _acquire_read(name, duration, timeout, timeoutStrategy, retry, backend):
+    startTime = time.time()
+    currentPid, currentThreadId = os.getpid(), threading.get_ident()
+    readerName = "{}{}_{}_{}".format(_reader_prefix(name), currentPid, currentThreadId, next(_readerSeq))
+    if resolve_backend(backend) == "flock":
+        return _acquire_any([name], duration, startTime, timeout, timeoutStrategy, retry, "flock", readerName)
+    gateToken = _acquire(name, duration, startTime, timeout, timeoutStrategy, retry, backend, False)
+    if gateToken is None:
+        return None
+    try:
+        return _create_lock_file(
+            readerName, get_lock_file_path(readerName), get_py_filename(), currentPid, currentThreadId, duration
+        )
+    finally:
+        release(name, gateToken, backend)
+
+
+def release_read(name, token, backend=None):
+    """释放 acquire_read 获取的读锁"""
+    _release_by_token(name, token)
+
+
+def acquire_write(name, duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RAISE, retry=30, backend=None):
+    """
+    获取写锁（排他锁）：获取名为 name 的排他锁后（此后新读者排队），等待已有读者全部离开
+
+    已有读者的过期 / 失主标记锁会被清理；等待读者超时时按 timeoutStrategy 处理，FORCE 清除剩余读者的标记锁。
+    参数与返回值同 acquire，用 release_write 释放
+    """
+    startTime = time.time()
+    backend = resolve_backend(backend)
+    token = acquire(name, duration, timeout, timeoutStrategy, retry, backend)
+    if token is None or backend == "flock":
+        return token
+    try:
+        readersGone = _wait_readers(name, startTime, timeout, timeoutStrategy, retry)
+    except BaseException:
+        release(name, token, backend)
+        raise
+    if not readersGone:  # GIVEUP策略
+        release(name, token, backend)
+        return None
+    return token
+
+
+def release_write(name, token, backend=None):
+    """释放 acquire_write 获取的写锁"""
+    release(name, token, backend)
+
+
+def _wait_readers(name, startTime, timeout, timeoutStrategy, retry):
+    """等待 name 的读者标记锁全部消失；超时且策略为 GIVEUP 时返回 False"""
+    prefix = _reader_prefix(name)
+    watcher = None
+    try:
+        while True:
+            liveReaders = []
+            for lockFile in LOCK_DIR.iterdir():
+                if lockFile.name.startswith(prefix) and lockFile.suffix == ".lock":
+                    # 清理过期 / 失主的读者；列目录后才被删除的文件不算
+                    if not _handle_existing_lock(lockFile.stem, lockFile) and lockFile.exists():
+                        liveReaders.append(lockFile)
+            if not liveReaders:
+                return True
+            if time.time() - startTime >= timeout:
+                for lockFile in liveReaders:
+                    if _handle_timeout(name, lockFile, timeoutStrategy) is None:
+                        return False
+                continue
+            if watcher is None:
+                # 先开始监视再重新检查，避免错过两次检查之间的释放
+                watcher = _LockDirWatcher(LOCK_DIR, retry)
+                continue
+            remainingTime = timeout - (time.time() - startTime)
+            watcher.wait(tuple(f.name for f in liveReaders), min(retry, remainingTime))
+    finally:
+        if watcher is not None:
+            watcher.close()
+
+
+def _slot_names(name, slots):
+    return ["{}.slot{}".format(name, i) for i in range(slots)]
+
+
+def acquire_slot(name, slots, duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RAISE, retry=30,
+                 backend=None):
+    """
+    获取信号量的一个名额：最多 slots 个持有者同时持有
+
+    每个名额是一个独立的锁 `<name>.slot<i>`，按编号顺序尝试，全部被占用时等待任意一个被释放；
+    超时策略为 FORCE 时强制清除第 0 个名额。参数与返回值同 acquire，
+    返回的 token 中锁名称为所占名额的锁名称，用 release_slot 释放
+    """
+    if slots < 1:
+        raise ValueError("slots 必须 >= 1：{}".format(slots))
+    return _timed_acquire(
+        name, _acquire_any,
+        _slot_names(name, slots), duration, time.time(), timeout, timeoutStrategy, retry, resolve_backend(backend)
+    )
+
+
+def release_slot(name, token, backend=None):
+    """释放 acquire_slot 获取的名额"""
+    _release_by_token(name, token)
+
+
 def query():
     """
     查询当前系统上所有的锁信息
 
     返回:
-      dict，键为锁的名字，值为锁文件中存储的 token 信息
+      dict，键为锁文件名（"<name>.lock"，flock 后端为 "<name>.flock"），值为锁文件中存储的 token 信息；
+      flock 后端的锁文件只在被持有时列出
     """
     lockDict = {}
     if not LOCK_DIR.exists():
         log.info("锁目录不存在")
         return lockDict
     for lockFile in LOCK_DIR.iterdir():
-        if lockFile.is_file():
+        if lockFile.is_file() and lockFile.suffix != ".tmp":
             try:
+                if lockFile.suffix == ".flock":
+                    token = _read_flock_token(lockFile)
+                    if token is not None:
+                        lockDict[lockFile.name] = token
+                    continue
                 token = lockFile.read_text(encoding="utf-8").strip()
                 lockDict[lockFile.name] = token
             except Exception as e:
@@ -309,6 +1218,535 @@ def query():
     return lockDict
 
 
+# ── 同时获取多个锁 ──
+def _try_acquire(name, duration, backend):
+    """不等待地尝试获取一次（会先清理过期 / 失主的旧锁），成功返回 token，被占用返回 None"""
+    if backend == "flock":
+        fds = {}
+        try:
+            return _try_flock(name, get_flock_file_path(name), fds, 0, duration)
+        finally:
+            for fd in fds.values():
+                os.close(fd)
+    return _try_lock_file(name, get_lock_file_path(name), duration)
+
+
+def acquire_many(names, duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RAISE, retry=30, backend=None):
+    """
+    同时获取多个命名锁
+
+    每一轮只在不持有任何锁时阻塞等待一个锁（首轮为排序后的第一个，之后为上一轮被占用的那个），
+    拿到后按名称排序依次尝试其余的锁（不等待）；任一被占用就释放本轮已持有的锁，随机退避后进入下一轮。
+    因此等待期间不会占着其它锁，多个调用方也不会互相死锁。timeout 为所有轮次的总等待上限。
+
+    参数:
+      names: 锁名称的可迭代对象（重复的名称只取一次）
+      其余参数同 acquire；超时策略为 FORCE 时对每个锁强制获取
+
+    返回:
+      dict，键为锁名称（按名称排序），值为对应的 token；超时策略为 GIVEUP 时超时返回 None
+    """
+    names = sorted(set(names))
+    # 中途放弃的轮次不计入统计：整组获取成功或超时后，每个锁只记一次，等待时间为整组的等待时间
+    waitStart = time.perf_counter()
+    tokens = None
+    try:
+        tokens = _acquire_many(names, duration, timeout, timeoutStrategy, retry, backend)
+    except LockAcquisitionTimeoutError:
+        for name in names:
+            _record_acquire(name, None, time.perf_counter() - waitStart)
+        raise
+    for name in names:
+        _record_acquire(name, tokens[name] if tokens else None, time.perf_counter() - waitStart)
+    return tokens
+
+
+def _acquire_many(names, duration, timeout, timeoutStrategy, retry, backend):
+    """acquire_many 的实现（不计入统计），names 须已排序去重"""
+    if not names:
+        return {}
+    backend = resolve_backend(backend)
+    startTime = time.time()
+    backoff = BACKOFF_START
+    first = names[0]
+    while True:
+        remainingTime = timeout - (time.time() - startTime)
+        held = {}
+        if remainingTime > 0:
+            token = _acquire(first, duration, time.time(), remainingTime, TimeoutStrategy.GIVEUP, retry, backend, False)
+            if token is not None:
+                held[first] = token
+                for name in names:
+                    if name in held:
+                        continue
+                    token = _try_acquire(name, duration, backend)
+                    if token is None:
+                        first = name  # 下一轮先等这个锁
+                        break
+                    held[name] = token
+                else:
+                    return {name: held[name] for name in names}
+                # 有锁被占用：释放本轮已持有的锁再等待
+                for name, token in held.items():
+                    release(name, token, backend)
+
+        if time.time() - startTime >= timeout:
+            log.info("等待多个锁超时，当前策略为：{}".format(timeoutStrategy.name))
+            if timeoutStrategy == TimeoutStrategy.RAISE:
+                raise LockAcquisitionTimeoutError("获取锁 {} 超时".format(", ".join(names)))
+            elif timeoutStrategy == TimeoutStrategy.GIVEUP:
+                return None
+            return {
+                name: _acquire(name, duration, time.time(), 0, TimeoutStrategy.FORCE, retry, backend, False)
+                for name in names
+            }
+        time.sleep(random.uniform(0, backoff))
+        backoff = min(backoff * 2, 0.5)
+
+
+def release_many(tokens, backend=None):
+    """释放 acquire_many 获取的全部锁，tokens 为其返回的 dict"""
+    for name in sorted(tokens, reverse=True):
+        release(name, tokens[name], backend)
+
+
+class MultiLock:
+    """
+    同时持有多个命名锁的上下文管理器
+    用法示例：
+        with MultiLock(["browserProfile", "account"], timeout=600) as tokens:
+            # tokens 为 {锁名称: token}
+    """
+
+    def __init__(self, names, duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RAISE, retry=30,
+                 backend=None):
+        self.names = list(names)
+        self.duration = duration
+        self.timeout = timeout
+        self.timeoutStrategy = timeoutStrategy
+        self.retry = retry
+        self.backend = backend
+        self.tokens = None
+
+    def __enter__(self):
+        self.tokens = acquire_many(
+            self.names, self.duration, self.timeout, self.timeoutStrategy, self.retry, self.backend
+        )
+        return self.tokens
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.tokens:
+            release_many(self.tokens, self.backend)
+
+
+# ── 统计 ──
+# 每个锁名称在内存中累计等待时间 / 持有时间的直方图（毫秒），以及成功获取、超时、过期回收、失主回收与强制清除的次数。
+# 持有时间从获取成功记到 release，按 token 对应（续租后跟随新 token）。
+HIST_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)  # 各桶上界，最后一桶无上界
+COUNTERS = ("acquired", "timeout", "expired", "owner_dead", "forced")
+
+
+class _Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(HIST_BOUNDS_MS) + 1)
+        self.count = 0
+        self.totalMs = 0.0
+        self.maxMs = 0.0
+
+    def add(self, ms):
+        self.buckets[bisect.bisect_left(HIST_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.totalMs += ms
+        self.maxMs = max(self.maxMs, ms)
+
+    def percentile(self, q):
+        """q 分位数所在桶的上界（不超过最大值），没有样本时为 0"""
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(HIST_BOUNDS_MS[i], self.maxMs) if i < len(HIST_BOUNDS_MS) else self.maxMs
+        return 0.0
+
+    def summary(self):
+        labels = ["<={}ms".format(b) for b in HIST_BOUNDS_MS] + [">{}ms".format(HIST_BOUNDS_MS[-1])]
+        return {
+            "count": self.count,
+            "total_ms": self.totalMs,
+            "mean_ms": self.totalMs / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.maxMs,
+            "buckets": {label: n for label, n in zip(labels, self.buckets) if n},
+        }
+
+
+class _LockStats:
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.wait = _Histogram()  # 成功获取与超时的等待时间
+        self.hold = _Histogram()
+
+    def add(self, event, ms=None):
+        if event == "release":
+            self.hold.add(ms)
+            return
+        self.counters[event] += 1
+        if ms is not None:
+            self.wait.add(ms)
+
+
+def _summarize(statsByName):
+    # 按总等待时间从高到低排列，最拖慢流水线的锁排在最前
+    ordered = sorted(statsByName.items(), key=lambda item: item[1].wait.totalMs, reverse=True)
+    return {name: dict(st.counters, wait=st.wait.summary(), hold=st.hold.summary()) for name, st in ordered}
+
+
+_stats = {}  # 锁名称 -> _LockStats
+_holdStarts = {}  # token -> (锁名称, 获取成功时的 perf_counter)
+HOLD_STARTS_MAX = 10000  # _holdStarts 的上限，超出时丢弃最早的记录
+_statsGuard = threading.Lock()
+_hooks = []
+_eventLogPath = os.environ.get(EVENTS_ENV) or None
+_eventLog = None
+
+
+def _record(name, event, ms=None):
+    """记录一个锁事件：累计到内存统计，并交给事件文件与已注册的 hook"""
+    with _statsGuard:
+        st = _stats.get(name)
+        if st is None:
+            st = _stats[name] = _LockStats()
+        st.add(event, ms)
+        if _eventLogPath is None and not _hooks:
+            return
+        record = {"time": round(time.time(), 3), "name": name, "event": event, "pid": os.getpid(), "host": HOSTNAME}
+        if ms is not None:
+            record["ms"] = round(ms, 3)
+        if _eventLogPath is not None:
+            _write_event(record)
+        hooks = list(_hooks)
+    for hook in hooks:
+        try:
+            hook(record)
+        except Exception as e:
+            log.error("锁统计 hook 执行失败：{}，错误：{}".format(hook, e))
+
+
+def _write_event(record):
+    # 在 _statsGuard 内调用；以追加方式打开，多个进程可写同一个文件（每行一次 write）
+    global _eventLog
+    try:
+        if _eventLog is None:
+            _eventLog = open(_eventLogPath, "a", encoding="utf-8")
+        _eventLog.write(json.dumps(record, ensure_ascii=False) + "\n")
+        _eventLog.flush()
+    except OSError as e:
+        log.error("写入锁事件文件失败：{}，错误：{}".format(_eventLogPath, e))
+
+
+def _record_acquire(name, token, waitSeconds):
+    if token is None:
+        _record(name, "timeout", waitSeconds * 1000)
+        return
+    with _statsGuard:
+        _holdStarts[token] = (name, time.perf_counter())
+        if len(_holdStarts) > HOLD_STARTS_MAX:
+            del _holdStarts[next(iter(_holdStarts))]  # 丢弃最早的记录（持有者一直未释放）
+    _record(name, "acquired", waitSeconds * 1000)
+
+
+def _timed_acquire(name, acquireFunc, *args):
+    """执行 acquireFunc(*args) 并记录等待时间：返回 None 或抛出 LockAcquisitionTimeoutError 记为超时，其它异常不记录"""
+    waitStart = time.perf_counter()
+    try:
+        token = acquireFunc(*args)
+    except LockAcquisitionTimeoutError:
+        _record_acquire(name, None, time.perf_counter() - waitStart)
+        raise
+    _record_acquire(name, token, time.perf_counter() - waitStart)
+    return token
+
+
+def _drop_hold(token):
+    # token 被过期回收 / 失主回收 / 强制清除后不会再被释放，丢弃其持有起点
+    if token:
+        with _statsGuard:
+            _holdStarts.pop(token, None)
+
+
+def _record_release(token):
+    with _statsGuard:
+        entry = _holdStarts.pop(token, None)
+    if entry is not None:
+        _record(entry[0], "release", (time.perf_counter() - entry[1]) * 1000)
+
+
+def _move_hold(token, newToken):
+    with _statsGuard:
+        entry = _holdStarts.pop(token, None)
+        if entry is not None:
+            _holdStarts[newToken] = entry
+
+
+def stats(reset=False):
+    """
+    返回本进程内各锁的统计，按总等待时间从高到低排列：
+        {锁名称: {"acquired", "timeout", "expired", "owner_dead", "forced", "wait": {...}, "hold": {...}}}
+    wait / hold 含 count、total_ms、mean_ms、p50_ms、p90_ms、p99_ms、max_ms 与非空的直方图桶 buckets；
+    分位数取所在桶的上界。读写锁、信号量与 acquire_many 的等待记在传入的锁名称下，过期 / 失主回收与强制清除记在被清除的锁文件名下。
+
+    参数:
+      reset: True 时返回后清零
+    """
+    with _statsGuard:
+        result = _summarize(_stats)
+        if reset:
+            _stats.clear()
+    return result
+
+
+def set_event_log(path):
+    """把之后的锁事件以 JSONL 追加到 path（None 表示停止写入），覆盖环境变量 LEBASE_LOCK_EVENTS 的设置"""
+    global _eventLogPath, _eventLog
+    with _statsGuard:
+        if _eventLog is not None:
+            _eventLog.close()
+            _eventLog = None
+        _eventLogPath = os.fspath(path) if path is not None else None
+
+
+def add_hook(hook):
+    """注册 hook(record)：每个锁事件调用一次，record 与事件文件中的一行相同；hook 的异常只记录日志"""
+    with _statsGuard:
+        _hooks.append(hook)
+
+
+def remove_hook(hook):
+    with _statsGuard:
+        _hooks.remove(hook)
+
+
+def summarize_events(path):
+    """汇总 JSONL 事件文件（可由多个进程写入），返回结构同 stats()；无法解析的行跳过"""
+    statsByName = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                name, event, ms = record["name"], record["event"], record.get("ms")
+            except (ValueError, KeyError, TypeError, AttributeError):
+                continue
+            if event != "release" and event not in COUNTERS:
+                continue
+            if event in ("acquired", "timeout", "release") and not isinstance(ms, (int, float)):
+                continue
+            statsByName.setdefault(name, _LockStats()).add(event, ms)
+    return _summarize(statsByName)
+
+
+# ── asyncio ──
+class _AsyncLockDirWatcher:
+    """
+    一个事件循环内所有 acquire_async 共用的 inotify 监视器
+
+    锁文件被删除 / 移走（flock 锁文件被关闭）时，唤醒等待该文件的 future；
+    无 inotify 或事件循环不支持 add_reader（如 Windows 的 Proactor）时 fd 为 None，由调用方退避重试。
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.futures = {}  # 文件名 (bytes) -> 等待该文件的 future 集合
+        self.users = 0
+        self.fd = None
+        if _inotify is None:
+            return
+        fd = _inotify.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            return
+        mask = _IN_DELETE | _IN_MOVED_FROM | _IN_CLOSE_WRITE
+        if _inotify.inotify_add_watch(fd, os.fsencode(str(LOCK_DIR)), mask) < 0:
+            os.close(fd)
+            return
+        try:
+            loop.add_reader(fd, self._on_readable)
+        except NotImplementedError:
+            os.close(fd)
+            return
+        self.fd = fd
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(data):
+            _, _, _, nameLen = _INOTIFY_EVENT.unpack_from(data, offset)
+            start = offset + _INOTIFY_EVENT.size
+            offset = start + nameLen
+            for future in self.futures.pop(data[start:offset].rstrip(b"\0"), ()):
+                if not future.done():
+                    future.set_result(True)
+
+    def register(self, fileName):
+        """返回一个在 fileName 出现事件时完成的 future；须在检查锁文件之前注册，避免错过其间的释放"""
+        future = self.loop.create_future()
+        self.futures.setdefault(os.fsencode(fileName), set()).add(future)
+        return future
+
+    def unregister(self, fileName, future):
+        key = os.fsencode(fileName)
+        waiting = self.futures.get(key)
+        if waiting is not None:
+            waiting.discard(future)
+            if not waiting:
+                del self.futures[key]
+
+    def close(self):
+        if self.fd is not None:
+            self.loop.remove_reader(self.fd)
+            os.close(self.fd)
+            self.fd = None
+
+
+_asyncWatchers = {}  # 事件循环 -> _AsyncLockDirWatcher，没有 acquire_async 在等待时关闭
+
+
+def _hold_async_watcher(loop):
+    watcher = _asyncWatchers.get(loop)
+    if watcher is None:
+        watcher = _asyncWatchers[loop] = _AsyncLockDirWatcher(loop)
+    watcher.users += 1
+    return watcher
+
+
+def _drop_async_watcher(loop, watcher):
+    watcher.users -= 1
+    if watcher.users == 0:
+        watcher.close()
+        _asyncWatchers.pop(loop, None)
+
+
+async def _try_in_executor(loop, name, tryLock, *args):
+    """
+    在线程池中执行一次 tryLock（_try_lock_file / _try_flock），返回其结果
+
+    等待的任务被取消时，线程仍会完成这次尝试：先等它结束并释放可能已获取的锁，再抛出 CancelledError，
+    否则 token 丢失、锁要到 duration 过期才能被获取；调用方也要等到此时才能关闭 tryLock 用到的 fds。
+    """
+    future = loop.run_in_executor(None, tryLock, *args)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        while not future.done():
+            try:
+                await asyncio.wait([future])
+            except asyncio.CancelledError:
+                pass
+        if not future.cancelled() and future.exception() is None and future.result() is not None:
+            release(name, future.result())
+            log.debug("获取锁的任务已取消，释放刚获取的锁：{}".format(future.result()))
+        raise
+
+
+async def acquire_async(
+    name, duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RAISE, retry=30, backend=None
+):
+    """
+    acquire 的 asyncio 版本，参数与返回值同 acquire
+
+    文件操作在默认线程池中执行；锁被占用时等待 inotify 驱动的 future（不可用时 asyncio.sleep 指数退避），
+    同一个事件循环可以同时等待任意多个命名锁。不经过同进程线程的内存排队（进程内移交）。
+    """
+    loop = asyncio.get_running_loop()
+    startTime = time.time()
+    useFlock = resolve_backend(backend) == "flock"
+    lockFile = await loop.run_in_executor(None, get_flock_file_path if useFlock else get_lock_file_path, name)
+    watcher = _hold_async_watcher(loop)
+    fds = {}
+    backoff = BACKOFF_START
+    waitStart = time.perf_counter()
+    token = None
+    timedOut = False  # 取消或其它异常不计入统计
+    try:
+        while True:
+            if time.time() - startTime >= timeout:
+                try:
+                    result = await loop.run_in_executor(None, _handle_timeout, name, lockFile, timeoutStrategy)
+                except LockAcquisitionTimeoutError:
+                    timedOut = True
+                    raise
+                if result is None:  # GIVEUP策略
+                    timedOut = True
+                    return None
+                if 0 in fds:  # FORCE策略已删除旧文件，重新打开
+                    os.close(fds.pop(0))
+            future = watcher.register(lockFile.name)
+            try:
+                if useFlock:
+                    token = await _try_in_executor(loop, name, _try_flock, name, lockFile, fds, 0, duration)
+                else:
+                    token = await _try_in_executor(loop, name, _try_lock_file, name, lockFile, duration)
+                if token is not None:
+                    return token
+                waitTime = min(retry, timeout - (time.time() - startTime))
+                if waitTime <= 0:
+                    continue
+                if watcher.fd is None:
+                    await asyncio.sleep(min(random.uniform(backoff / 2, backoff), waitTime))
+                    backoff = min(backoff * 2, retry)
+                else:
+                    try:
+                        await asyncio.wait_for(future, waitTime)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                watcher.unregister(lockFile.name, future)
+    finally:
+        for fd in fds.values():
+            os.close(fd)
+        _drop_async_watcher(loop, watcher)
+        if token is not None or timedOut:
+            _record_acquire(name, token, time.perf_counter() - waitStart)
+
+
+async def release_async(name, token, backend=None):
+    """release 的 asyncio 版本（在线程池中执行）"""
+    await asyncio.get_running_loop().run_in_executor(None, release, name, token, backend)
+
+
+class AsyncLock:
+    """
+    锁的异步上下文管理器，语义同 Lock
+    用法示例：
+        async with AsyncLock("myLock", duration=600, timeout=3600) as token:
+            # 执行需要锁保护的代码
+    """
+
+    def __init__(self, name, duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RAISE, retry=30,
+                 backend=None):
+        self.name = name
+        self.duration = duration
+        self.timeout = timeout
+        self.timeoutStrategy = timeoutStrategy
+        self.retry = retry
+        self.backend = backend
+        self.token = None
+
+    async def __aenter__(self):
+        self.token = await acquire_async(
+            self.name, self.duration, self.timeout, self.timeoutStrategy, self.retry, self.backend
+        )
+        return self.token
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.token:
+            await release_async(self.name, self.token, self.backend)
+
+
 # 定义支持 with 语句的上下文管理器
 class Lock:
     """
@@ -316,23 +1754,131 @@ class Lock:
     用法示例：
         with Lock("myLock", duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RAISE) as token:
             # 执行需要锁保护的代码
+
+    心跳模式：heartbeat=True 时在后台线程中每隔 heartbeatInterval 秒（默认 duration / 3）续租一次，
+    duration 可以设得很短（acquireTime 精确到秒，duration 应比续租间隔至少长 1 秒）；续租失败（锁已被回收或强制释放）时停止心跳并调用 onLeaseLost(name, token)。
+    续租会改变 token，当前 token 见 self.token。
+        with Lock("myLock", duration=30, heartbeat=True, onLeaseLost=handler) as token:
+            ...
+    """
+
+    def __init__(self, name, duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RAISE, retry=30,
+                 backend=None, heartbeat=False, heartbeatInterval=None, onLeaseLost=None, fair=False):
+        self.name = name
+        self.duration = duration
+        self.timeout = timeout
+        self.timeoutStrategy = timeoutStrategy
+        self.retry = retry
+        self.backend = backend
+        self.fair = fair
+        self.heartbeat = heartbeat
+        self.heartbeatInterval = heartbeatInterval if heartbeatInterval is not None else duration / 3
+        self.onLeaseLost = onLeaseLost
+        self.token = None
+        self._renewLock = threading.Lock()
+        self._stopHeartbeat = threading.Event()
+        self._heartbeatThread = None
+
+    def __enter__(self):
+        self.token = acquire(
+            self.name, self.duration, self.timeout, self.timeoutStrategy, self.retry, self.backend, self.fair
+        )
+        if self.token and self.heartbeat:
+            self._stopHeartbeat.clear()
+            self._heartbeatThread = threading.Thread(
+                target=self._heartbeat_loop, name="LockHeartbeat-{}".format(self.name), daemon=True
+            )
+            self._heartbeatThread.start()
+        return self.token
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._heartbeatThread is not None:
+            self._stopHeartbeat.set()
+            self._heartbeatThread.join()
+            self._heartbeatThread = None
+        if self.token:
+            release(self.name, self.token, self.backend)
+
+    def renew(self):
+        """续租一次，成功返回新 token，锁已丢失返回 None"""
+        with self._renewLock:
+            if not self.token:
+                return None
+            newToken = renew(self.name, self.token, self.backend)
+            if newToken is not None:
+                self.token = newToken
+            return newToken
+
+    def _heartbeat_loop(self):
+        while not self._stopHeartbeat.wait(self.heartbeatInterval):
+            lostToken = self.token
+            if self.renew() is None:
+                log.error("锁租约已丢失：{}".format(lostToken))
+                if self.onLeaseLost is not None:
+                    self.onLeaseLost(self.name, lostToken)
+                return
+
+
+class SharedLock:
+    """
+    读写锁上下文管理器
+    用法示例：
+        with SharedLock("profile") as token:  # 读：可与其它读者并发
+            ...
+        with SharedLock("profile", write=True) as token:  # 写：独占
+            ...
+    """
+
+    def __init__(self, name, write=False, duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RAISE,
+                 retry=30, backend=None):
+        self.name = name
+        self.write = write
+        self.duration = duration
+        self.timeout = timeout
+        self.timeoutStrategy = timeoutStrategy
+        self.retry = retry
+        self.backend = backend
+        self.token = None
+
+    def __enter__(self):
+        acquireFunc = acquire_write if self.write else acquire_read
+        self.token = acquireFunc(self.name, self.duration, self.timeout, self.timeoutStrategy, self.retry, self.backend)
+        return self.token
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.token:
+            releaseFunc = release_write if self.write else release_read
+            releaseFunc(self.name, self.token, self.backend)
+
+
+class Semaphore:
+    """
+    信号量上下文管理器：最多 slots 个持有者同时进入
+    用法示例：
+        with Semaphore("browser", slots=4) as token:
+            ...
     """
 
-    def __init__(self, name, duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RAISE, retry=30):
+    def __init__(self, name, slots, duration=600, timeout=3600, timeoutStrategy=TimeoutStrategy.RAISE, retry=30,
+                 backend=None):
         self.name = name
+        self.slots = slots
         self.duration = duration
         self.timeout = timeout
         self.timeoutStrategy = timeoutStrategy
         self.retry = retry
+        self.backend = backend
         self.token = None
 
     def __enter__(self):
-        self.token = acquire(self.name, self.duration, self.timeout, self.timeoutStrategy, self.retry)
+        self.token = acquire_slot(
+            self.name, self.slots, self.duration, self.timeout, self.timeoutStrategy, self.retry, self.backend
+        )
         return self.token
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.token:
-            release(self.name, self.token)
+            release_slot(self.name, self.token, self.backend)
 
 
 # Demo 用例
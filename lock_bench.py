@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+lock.py 性能基准
+
+用法：
+    python -m lebase.lock_bench [-t 16] [-n 50] [--hold-ms 1] [--processes]
+
+多个线程（--processes 时为多个进程）竞争同一个命名锁，每个获取 / 释放 n 次（每次持有 --hold-ms 毫秒），
+对比以下模式的吞吐 (次/秒) 与等待时间分布 (p50 / p99 / max)：
+  - file only：每个线程都直接竞争锁文件
+  - in-process handoff：同进程线程在内存中排队、直接移交（默认行为，仅线程模式）
+  - fair queue：fair=True，在 `<name>.queue/` 中取号，按到达顺序获取
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import threading
+import time
+from typing import Optional
+
+from lebase import lock
+
+
+def _percentile(sortedValues: list[float], q: float) -> float:
+    """最近秩法取百分位数，sortedValues 须已升序排列。"""
+    if not sortedValues:
+        return 0.0
+    k = max(0, min(len(sortedValues) - 1, int(round(q / 100 * len(sortedValues) + 0.5)) - 1))
+    return sortedValues[k]
+
+
+def _contend(name: str, n: int, hold_ms: float, fair: bool) -> list[float]:
+    """获取 / 释放 n 次，返回每次的等待秒数。"""
+    waits = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        token = lock.acquire(name, duration=60, timeout=600, retry=30, fair=fair)
+        waits.append(time.perf_counter() - t0)
+        if hold_ms:
+            time.sleep(hold_ms / 1000)
+        lock.release(name, token)
+    return waits
+
+
+def bench_contention(threads: int, n: int, *, hold_ms: float = 0.0, handoff: bool = True, fair: bool = False,
+                     processes: bool = False, name: str = "bench_contention") -> dict:
+    """threads 个线程（processes=True 时为进程）各获取 / 释放 n 次同一个锁，返回吞吐与等待时间统计。"""
+    waits: list[float] = []
+    saved = lock._local_handoff
+    lock._local_handoff = handoff
+    try:
+        if processes:
+            with multiprocessing.get_context().Pool(threads) as pool:
+                t0 = time.perf_counter()
+                for part in pool.starmap(_contend, [(name, n, hold_ms, fair)] * threads):
+                    waits.extend(part)
+                elapsed = time.perf_counter() - t0
+        else:
+            barrier = threading.Barrier(threads + 1)
+
+            def worker() -> None:
+                barrier.wait()
+                waits.extend(_contend(name, n, hold_ms, fair))
+
+            pool = [threading.Thread(target=worker) for _ in range(threads)]
+            for t in pool:
+                t.start()
+            barrier.wait()
+            t0 = time.perf_counter()
+            for t in pool:
+                t.join()
+            elapsed = time.perf_counter() - t0
+    finally:
+        lock._local_handoff = saved
+
+    waits.sort()
+    total = threads * n
+    return {
+        "ops_per_sec": total / elapsed if elapsed > 0 else float("inf"),
+        "mean_wait_ms": sum(waits) / len(waits) * 1000,
+        "p50_wait_ms": _percentile(waits, 50) * 1000,
+        "p99_wait_ms": _percentile(waits, 99) * 1000,
+        "max_wait_ms": waits[-1] * 1000,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="lock benchmark")
+    parser.add_argument("-t", "--threads", type=int, default=16, help="竞争线程数（--processes 时为进程数）")
+    parser.add_argument("-n", type=int, default=50, help="每个线程获取 / 释放的次数")
+    parser.add_argument("--hold-ms", type=float, default=1.0, help="每次持有锁的毫秒数")
+    parser.add_argument("--processes", action="store_true", help="用多进程代替多线程竞争")
+    args = parser.parse_args(argv)
+
+    modes = [("file only", dict(handoff=False)), ("fair queue", dict(fair=True))]
+    if not args.processes:
+        modes.insert(1, ("in-process handoff", dict(handoff=True)))
+    for label, kwargs in modes:
+        res = bench_contention(args.threads, args.n, hold_ms=args.hold_ms, processes=args.processes, **kwargs)
+        print(f"{label:<20} {res['ops_per_sec']:>10,.0f} acquires/sec"
+              f"  wait p50 {res['p50_wait_ms']:>8.2f} ms  p99 {res['p99_wait_ms']:>8.2f} ms"
+              f"  max {res['max_wait_ms']:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
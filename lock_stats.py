@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+lock.py 锁事件汇总
+
+用法：
+    LEBASE_LOCK_EVENTS=/tmp/lock_events.jsonl python my_pipeline.py
+    python -m lebase.lock_stats [/tmp/lock_events.jsonl] [--top 20] [--json]
+
+读取 lock 写出的 JSONL 事件文件（缺省取环境变量 LEBASE_LOCK_EVENTS），按总等待时间从高到低列出各锁的
+获取次数、超时次数、等待时间 p50 / p99 / max 与总和、持有时间 p50 / p99，以及过期回收、失主回收与强制清除次数。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from typing import Optional
+
+from lebase import lock
+
+
+def format_table(summary: dict, top: Optional[int] = None) -> str:
+    """把 stats() / summarize_events() 的结果排成表格文本。"""
+    header = (f"{'lock':<32} {'acq':>7} {'t/o':>5} {'wait p50':>9} {'p99':>9} {'max':>9} {'total s':>9}"
+              f" {'hold p50':>9} {'p99':>9} {'exp':>4} {'dead':>4} {'force':>5}")
+    lines = [header, "-" * len(header)]
+    for name, st in list(summary.items())[:top]:
+        wait, hold = st["wait"], st["hold"]
+        lines.append(
+            f"{name:<32} {st['acquired']:>7} {st['timeout']:>5} {wait['p50_ms']:>7.1f}ms {wait['p99_ms']:>7.1f}ms"
+            f" {wait['max_ms']:>7.1f}ms {wait['total_ms'] / 1000:>9.2f} {hold['p50_ms']:>7.1f}ms {hold['p99_ms']:>7.1f}ms"
+            f" {st['expired']:>4} {st['owner_dead']:>4} {st['forced']:>5}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="lock event summary")
+    parser.add_argument("path", nargs="?", default=os.environ.get(lock.EVENTS_ENV), help="JSONL 事件文件")
+    parser.add_argument("--top", type=int, default=None, help="只列出总等待时间最长的前 N 个锁")
+    parser.add_argument("--json", action="store_true", help="输出 JSON 而不是表格")
+    args = parser.parse_args(argv)
+    if not args.path:
+        parser.error("未指定事件文件，也未设置环境变量 {}".format(lock.EVENTS_ENV))
+
+    summary = lock.summarize_events(args.path)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print(format_table(summary, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
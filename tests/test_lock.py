@@ -3,11 +3,51 @@
 lock.py 的测试文件 - 最终优化版本，目标4秒内完成所有测试
 """
 
+import asyncio
+import multiprocessing
+import os
 import threading
 import time
 from typing import Dict, List
 
-from lebase.lock import Lock, LockAcquisitionTimeoutError, TimeoutStrategy, acquire, query, release
+import pytest
+
+from lebase.lock import (
+    AsyncLock,
+    Lock,
+    LockAcquisitionTimeoutError,
+    MultiLock,
+    Semaphore,
+    SharedLock,
+    TimeoutStrategy,
+    acquire,
+    add_hook,
+    acquire_async,
+    acquire_many,
+    acquire_read,
+    acquire_slot,
+    acquire_write,
+    get_lock_file_path,
+    query,
+    release,
+    release_async,
+    release_many,
+    release_read,
+    release_slot,
+    remove_hook,
+    renew,
+    set_event_log,
+    stats,
+    summarize_events,
+    write_token_to_file,
+)
+
+try:
+    import fcntl  # noqa: F401
+
+    HAS_FLOCK = True
+except ImportError:
+    HAS_FLOCK = False
 
 
 def test_basic_lock_operations():
@@ -158,6 +198,641 @@ def test_timeout_strategies():
     release(lock_name, new_token)
 
 
+def _handoff_latency(lock_name):
+    """持有者释放锁后，等待者（retry=30）拿到锁所需的时间"""
+    token = acquire(lock_name, duration=60, timeout=30, retry=30)
+    acquired_at: List[float] = []
+
+    def waiter():
+        t = acquire(lock_name, duration=60, timeout=30, retry=30)
+        acquired_at.append(time.time())
+        release(lock_name, t)
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.3)
+    released_at = time.time()
+    release(lock_name, token)
+    thread.join(5)
+    assert acquired_at, "等待者未能在 5 秒内获取锁"
+    return acquired_at[0] - released_at
+
+
+def test_waiter_wakes_on_release():
+    """锁文件被删除后等待者应立即醒来，而不是睡满 retry"""
+    assert _handoff_latency("test_wake_on_release") < 0.5
+
+
+def test_waiter_backoff_without_inotify(monkeypatch):
+    """无 inotify 时按指数退避重试，仍远小于 retry"""
+    import lebase.lock as lockmod
+
+    monkeypatch.setattr(lockmod, "_inotify", None)
+    assert _handoff_latency("test_wake_backoff") < 1.0
+
+
+def test_in_process_handoff():
+    """同进程多线程竞争：内存排队、直接移交，互斥且无需等待 retry"""
+    lock_name = "test_in_process_handoff"
+    holders: List[int] = []
+    overlaps: List[int] = []
+    tokens: List[str] = []
+
+    def worker():
+        for _ in range(20):
+            token = acquire(lock_name, duration=60, timeout=30, retry=30)
+            holders.append(1)
+            if len(holders) > 1:
+                overlaps.append(1)
+            assert query()[lock_name + ".lock"] == token  # 锁文件中的 token 是当前持有者
+            tokens.append(token)
+            holders.pop()
+            release(lock_name, token)
+
+    start = time.time()
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert time.time() - start < 5
+    assert not overlaps
+    assert len(tokens) == 160
+    assert lock_name + ".lock" not in query()
+
+
+@pytest.mark.skipif(not HAS_FLOCK, reason="flock 后端仅支持 Unix")
+def test_flock_backend_basic():
+    """flock 后端：同样的 acquire / query / release / Lock 接口与 token 格式"""
+    lock_name = "test_flock_basic"
+    token = acquire(lock_name, duration=60, timeout=30, retry=1, backend="flock")
+    assert token.startswith(lock_name + "-")
+    assert query()[lock_name + ".flock"] == token
+
+    # 同一进程的另一次获取也会被挡住
+    assert acquire(lock_name, timeout=0.2, timeoutStrategy=TimeoutStrategy.GIVEUP, backend="flock") is None
+
+    release(lock_name, token)
+    assert lock_name + ".flock" not in query()
+
+    with Lock(lock_name, timeout=1, backend="flock") as token2:
+        assert query()[lock_name + ".flock"] == token2
+    assert lock_name + ".flock" not in query()
+
+
+@pytest.mark.skipif(not HAS_FLOCK, reason="flock 后端仅支持 Unix")
+def test_flock_backend_from_env(monkeypatch):
+    """未传 backend 时从环境变量选择后端"""
+    monkeypatch.setenv("LEBASE_LOCK_BACKEND", "flock")
+    lock_name = "test_flock_env"
+    token = acquire(lock_name, duration=60, timeout=30, retry=1)
+    assert lock_name + ".flock" in query()
+    assert lock_name + ".lock" not in query()
+    release(lock_name, token)
+
+    monkeypatch.setenv("LEBASE_LOCK_BACKEND", "nope")
+    with pytest.raises(ValueError):
+        acquire(lock_name, timeout=1)
+
+
+def _hold_flock_and_die(lock_name):
+    acquire(lock_name, duration=600, timeout=5, backend="flock")
+    os._exit(0)  # 不释放，模拟进程崩溃
+
+
+@pytest.mark.skipif(not HAS_FLOCK, reason="flock 后端仅支持 Unix")
+def test_flock_released_when_holder_dies():
+    """持有进程退出后锁立即可用，无需等待 duration 过期"""
+    lock_name = "test_flock_dead_holder"
+    child = multiprocessing.get_context("fork").Process(target=_hold_flock_and_die, args=(lock_name,))
+    child.start()
+    child.join(10)
+    assert child.exitcode == 0
+
+    start = time.time()
+    token = acquire(lock_name, duration=60, timeout=2, timeoutStrategy=TimeoutStrategy.GIVEUP, backend="flock")
+    assert token is not None
+    assert time.time() - start < 1
+    release(lock_name, token)
+
+
+def _hold_file_lock_and_die(lock_name, hold_seconds):
+    acquire(lock_name, duration=600, timeout=5)
+    time.sleep(hold_seconds)
+    os._exit(0)  # 不释放，模拟进程崩溃
+
+
+@pytest.mark.skipif(os.name == "nt", reason="需要 fork 与 os.kill(pid, 0)")
+def test_dead_owner_reclaimed():
+    """本机持有进程已退出时立即回收锁，无需等待 duration 过期"""
+    lock_name = "test_dead_owner"
+    child = multiprocessing.get_context("fork").Process(target=_hold_file_lock_and_die, args=(lock_name, 0))
+    child.start()
+    child.join(10)
+    assert lock_name + ".lock" in query()
+
+    start = time.time()
+    token = acquire(lock_name, duration=60, timeout=2, timeoutStrategy=TimeoutStrategy.GIVEUP, retry=30)
+    assert token is not None
+    assert time.time() - start < 1
+    release(lock_name, token)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="需要 fork 与 os.kill(pid, 0)")
+def test_waiter_wakes_when_owner_dies():
+    """等待期间持有进程崩溃，等待者应立即接手"""
+    lock_name = "test_owner_dies"
+    child = multiprocessing.get_context("fork").Process(target=_hold_file_lock_and_die, args=(lock_name, 0.5))
+    child.start()
+    while lock_name + ".lock" not in query():
+        time.sleep(0.01)
+
+    start = time.time()
+    token = acquire(lock_name, duration=60, timeout=10, retry=30)
+    assert token is not None
+    assert time.time() - start < 3  # 远小于 retry
+    release(lock_name, token)
+    child.join(10)
+
+
+def _hold_file_lock_until(lock_name, tokens, done):
+    tokens.put(acquire(lock_name, duration=600, timeout=5))
+    done.wait(10)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="需要 fork 与 os.kill(pid, 0)")
+def test_forked_owner_not_reclaimed():
+    """fork 出的子进程持有锁时，父进程不能把它当作 PID 已复用的失主锁回收"""
+    from lebase.lock import is_lock_owner_dead
+
+    lock_name = "test_forked_owner"
+    ctx = multiprocessing.get_context("fork")
+    tokens, done = ctx.Queue(), ctx.Event()
+    child = ctx.Process(target=_hold_file_lock_until, args=(lock_name, tokens, done))
+    child.start()
+    try:
+        token = tokens.get(timeout=10)
+        assert not is_lock_owner_dead(token)
+        assert acquire(lock_name, **GIVEUP_FAST) is None
+    finally:
+        done.set()
+        child.join(10)
+    release(lock_name, "FORCE")
+
+
+def test_owner_liveness_checks():
+    """token 中的主机名与进程启动时间"""
+    from lebase.lock import HOSTNAME, is_lock_owner_dead, parse_token
+
+    token = acquire("test_liveness", duration=60, timeout=5)
+    parsed = parse_token(token)
+    assert parsed["hostname"] == HOSTNAME
+    assert parsed["pidThread"].startswith(str(os.getpid()) + "_")
+    assert not is_lock_owner_dead(token)  # 本进程持有
+    release("test_liveness", token)
+
+    now = int(time.time())
+    ppid = os.getppid()
+    # 旧格式、其它主机：无法判断，视为存活
+    assert not is_lock_owner_dead("name-file-{}_1-{}-600".format(ppid, now))
+    assert not is_lock_owner_dead("name-file-999999999_1-{}-600-other-host-1".format(now))
+    if os.path.exists("/proc/{}/stat".format(ppid)):
+        # 进程存在但启动时间不符：PID 已被复用
+        assert is_lock_owner_dead("name-file-{}_1-{}-600-{}-1".format(ppid, now, HOSTNAME))
+
+
+def test_renew():
+    """续租更新 acquireTime，旧 token 随之失效"""
+    lock_name = "test_renew"
+    token = acquire(lock_name, duration=60, timeout=5)
+    time.sleep(1.05)
+    new_token = renew(lock_name, token)
+    assert new_token is not None and new_token != token
+    assert query()[lock_name + ".lock"] == new_token
+    assert renew(lock_name, token) is None
+    release(lock_name, new_token)
+    assert lock_name + ".lock" not in query()
+
+
+def test_heartbeat_keeps_short_lease():
+    """心跳模式下持有时间可远超 duration"""
+    lock_name = "test_heartbeat"
+    # acquireTime 精确到秒，duration=2 时每次续租后至少还剩 1 秒
+    lock = Lock(lock_name, duration=2, timeout=5, heartbeat=True, heartbeatInterval=0.2)
+    with lock as token:
+        time.sleep(2.5)
+        assert acquire(lock_name, timeout=0.3, timeoutStrategy=TimeoutStrategy.GIVEUP) is None
+        assert lock.token != token
+        assert query()[lock_name + ".lock"] == lock.token
+    assert lock_name + ".lock" not in query()
+
+
+def test_heartbeat_lease_lost_callback():
+    """锁被强制释放后，下一次续租失败并回调"""
+    lock_name = "test_heartbeat_lost"
+    lost: List[str] = []
+    lost_event = threading.Event()
+
+    def on_lost(name, token):
+        lost.append(name)
+        lost_event.set()
+
+    with Lock(lock_name, duration=60, timeout=5, heartbeat=True, heartbeatInterval=0.1, onLeaseLost=on_lost):
+        release(lock_name, "FORCE")
+        assert lost_event.wait(2)
+    assert lost == [lock_name]
+
+
+GIVEUP_FAST = dict(timeout=0.3, retry=1, timeoutStrategy=TimeoutStrategy.GIVEUP)
+
+
+@pytest.mark.parametrize("backend", ["file", pytest.param("flock", marks=pytest.mark.skipif(not HAS_FLOCK, reason="Unix"))])
+def test_shared_lock(backend):
+    """多个读者并发；写者与读者互斥"""
+    lock_name = "test_shared_lock_" + backend
+    r1 = acquire_read(lock_name, timeout=2, backend=backend)
+    r2 = acquire_read(lock_name, timeout=2, backend=backend)
+    assert r1 and r2 and r1 != r2
+    assert acquire_write(lock_name, backend=backend, **GIVEUP_FAST) is None
+
+    release_read(lock_name, r1, backend)
+    release_read(lock_name, r2, backend)
+    with SharedLock(lock_name, write=True, timeout=2, backend=backend) as w:
+        assert w is not None
+        assert acquire_read(lock_name, backend=backend, **GIVEUP_FAST) is None
+    with SharedLock(lock_name, timeout=2, backend=backend) as r3:
+        assert r3 is not None
+    assert not [k for k in query() if k.startswith(lock_name)]
+
+
+def test_writer_waits_for_readers():
+    """写者在读者离开后立即获得锁，期间新读者排队"""
+    lock_name = "test_writer_waits"
+    reader = acquire_read(lock_name, timeout=2)
+    got: List[float] = []
+
+    def writer():
+        token = acquire_write(lock_name, timeout=5, retry=30)
+        got.append(time.time())
+        release(lock_name, token)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    time.sleep(0.3)
+    released_at = time.time()
+    release_read(lock_name, reader)
+    thread.join(5)
+    assert got and got[0] - released_at < 0.5
+
+
+def test_semaphore():
+    """最多 slots 个持有者同时持有；token 中的锁名称为名额名"""
+    from lebase.lock import parse_token
+
+    lock_name = "test_semaphore"
+    t1 = acquire_slot(lock_name, 2, timeout=2)
+    t2 = acquire_slot(lock_name, 2, timeout=2)
+    assert {parse_token(t1)["name"], parse_token(t2)["name"]} == {lock_name + ".slot0", lock_name + ".slot1"}
+    assert acquire_slot(lock_name, 2, **GIVEUP_FAST) is None
+    with pytest.raises(LockAcquisitionTimeoutError):
+        acquire_slot(lock_name, 2, timeout=0.3, retry=1)
+
+    release_slot(lock_name, t1)
+    with Semaphore(lock_name, slots=2, timeout=2) as t3:
+        assert parse_token(t3)["name"] == lock_name + ".slot0"
+    release_slot(lock_name, t2)
+    assert not [k for k in query() if k.startswith(lock_name)]
+
+
+def test_fair_queue_order():
+    """fair=True 时严格按到达顺序获取锁，结束后队列为空"""
+    from lebase.lock import get_queue_dir_path
+
+    lock_name = "test_fair_queue"
+    holder = acquire(lock_name, duration=60, timeout=5)
+    order: List[int] = []
+
+    def waiter(i):
+        token = acquire(lock_name, duration=60, timeout=10, retry=30, fair=True)
+        order.append(i)
+        time.sleep(0.02)
+        release(lock_name, token)
+
+    threads = []
+    for i in range(5):
+        thread = threading.Thread(target=waiter, args=(i,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.05)  # 保证取号顺序
+    release(lock_name, holder)
+    for thread in threads:
+        thread.join(10)
+
+    assert order == [0, 1, 2, 3, 4]
+    assert list(get_queue_dir_path(lock_name).iterdir()) == []
+
+
+def test_fair_queue_tickets_increase():
+    """先取号的票据离开后，后取的号仍排在所有已取的号之后"""
+    from lebase.lock import _queue_tickets, _take_ticket, get_queue_dir_path
+
+    queueDir = get_queue_dir_path("test_fair_tickets")
+    first = _take_ticket(queueDir, "t1")
+    second = _take_ticket(queueDir, "t2")
+    os.remove(second)  # 排在队尾的等待者超时离开
+    third = _take_ticket(queueDir, "t3")
+    assert first.name < second.name < third.name
+    assert _queue_tickets(queueDir) == [first.name, third.name]
+    for ticket in (first, third):
+        os.remove(ticket)
+
+
+def test_fair_queue_timeout_leaves_queue():
+    """等待超时后离开队列，不阻塞后来者"""
+    from lebase.lock import get_queue_dir_path
+
+    lock_name = "test_fair_timeout"
+    holder = acquire(lock_name, duration=60, timeout=5)
+    assert acquire(lock_name, fair=True, **GIVEUP_FAST) is None
+    with pytest.raises(LockAcquisitionTimeoutError):
+        acquire(lock_name, fair=True, timeout=0.3, retry=1)
+    assert list(get_queue_dir_path(lock_name).iterdir()) == []
+    release(lock_name, holder)
+
+    with Lock(lock_name, timeout=2, fair=True) as token:
+        assert token is not None
+
+
+def test_async_lock_basic():
+    """acquire_async / release_async / AsyncLock 与同步接口互斥"""
+    lock_name = "test_async_basic"
+
+    async def main():
+        token = await acquire_async(lock_name, duration=60, timeout=5)
+        assert query()[lock_name + ".lock"] == token
+        assert await acquire_async(lock_name, **GIVEUP_FAST) is None
+        await release_async(lock_name, token)
+        async with AsyncLock(lock_name, timeout=2) as token2:
+            assert token2 is not None
+            assert acquire(lock_name, **GIVEUP_FAST) is None
+        assert lock_name + ".lock" not in query()
+
+    asyncio.run(main())
+
+
+def test_async_wait_keeps_loop_responsive():
+    """一个事件循环同时等待多个命名锁，等待期间事件循环照常运行，释放后立即获取"""
+    names = ["test_async_many_{}".format(i) for i in range(5)]
+    held = [acquire(n, duration=60, timeout=5) for n in names]
+    released_at: List[float] = []
+
+    def releaser():
+        time.sleep(0.3)
+        released_at.append(time.time())
+        for n, t in zip(names, held):
+            release(n, t)
+
+    async def main():
+        ticks = 0
+        done = False
+
+        async def ticker():
+            nonlocal ticks
+            while not done:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        tick_task = asyncio.ensure_future(ticker())
+        tokens = await asyncio.gather(*(acquire_async(n, duration=60, timeout=10, retry=30) for n in names))
+        acquired_at = time.time()
+        done = True
+        await tick_task
+        for n, t in zip(names, tokens):
+            await release_async(n, t)
+        return acquired_at, ticks
+
+    thread = threading.Thread(target=releaser)
+    thread.start()
+    acquired_at, ticks = asyncio.run(main())
+    thread.join()
+    assert acquired_at - released_at[0] < 1
+    assert ticks >= 15
+
+
+def test_acquire_many():
+    """同时获取多个锁，返回按名称排序的 {名称: token}"""
+    names = ["test_many_b", "test_many_a", "test_many_b"]
+    tokens = acquire_many(names, duration=60, timeout=5)
+    assert list(tokens) == ["test_many_a", "test_many_b"]
+    locks = query()
+    assert all(locks[n + ".lock"] == t for n, t in tokens.items())
+    release_many(tokens)
+    assert not [k for k in query() if k.startswith("test_many_")]
+
+    with MultiLock(["test_many_a", "test_many_b"], timeout=5) as tokens:
+        assert len(tokens) == 2
+
+
+def test_acquire_many_backs_off():
+    """等待被占用的锁时不占着其它锁；释放后整组获取"""
+    blocker = acquire("test_backoff_b", duration=60, timeout=5)
+    result: List[Dict[str, str]] = []
+
+    def worker():
+        result.append(acquire_many(["test_backoff_a", "test_backoff_b"], duration=60, timeout=10, retry=30))
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    time.sleep(0.3)
+    # 等待 b 期间 a 没有被占着
+    token_a = acquire("test_backoff_a", **GIVEUP_FAST)
+    assert token_a is not None
+    release("test_backoff_a", token_a)
+
+    release("test_backoff_b", blocker)
+    thread.join(5)
+    assert result and set(result[0]) == {"test_backoff_a", "test_backoff_b"}
+    release_many(result[0])
+
+    # 中途放弃的轮次不计入统计：a 为上面的直接获取与整组获取各一次，b 为 blocker 与整组获取各一次
+    st = stats()
+    for name in ("test_backoff_a", "test_backoff_b"):
+        assert st[name]["acquired"] == 2 and st[name]["timeout"] == 0
+        assert st[name]["hold"]["count"] == 2
+
+
+def test_acquire_many_timeout_bounded():
+    """总等待时间受 timeout 限制，超时后不残留已获取的锁"""
+    blocker = acquire("test_many_to_b", duration=60, timeout=5)
+    start = time.time()
+    assert acquire_many(["test_many_to_a", "test_many_to_b"], **GIVEUP_FAST) is None
+    assert time.time() - start < 1.5
+    assert "test_many_to_a.lock" not in query()
+    with pytest.raises(LockAcquisitionTimeoutError):
+        acquire_many(["test_many_to_a", "test_many_to_b"], timeout=0.3, retry=1)
+    release("test_many_to_b", blocker)
+
+
+def test_stats_wait_and_hold():
+    """统计获取次数、超时次数、等待时间与持有时间"""
+    name = "test_stats_hold"
+    token = acquire(name, duration=60, timeout=5)
+    assert acquire(name, **GIVEUP_FAST) is None
+    time.sleep(0.05)
+    token = renew(name, token)  # 持有时间跟随续租后的 token
+    release(name, token)
+
+    st = stats()[name]
+    assert st["acquired"] == 1 and st["timeout"] == 1
+    assert st["wait"]["count"] == 2 and st["wait"]["max_ms"] >= 250
+    assert st["hold"]["count"] == 1 and st["hold"]["max_ms"] >= 50
+    assert st["wait"]["p50_ms"] <= st["wait"]["p99_ms"] <= st["wait"]["max_ms"]
+    assert sum(st["hold"]["buckets"].values()) == 1
+
+
+def test_stats_reclaim_and_force():
+    """统计过期回收与强制清除"""
+    name = "test_stats_reclaim"
+    write_token_to_file(get_lock_file_path(name), "{}-old.py-1_1-1000-1".format(name))  # 早已过期的旧格式 token
+    assert acquire(name, duration=60, timeout=5) is not None
+    forced = acquire(name, duration=60, timeout=0.2, retry=1, timeoutStrategy=TimeoutStrategy.FORCE)
+    assert forced is not None
+    release(name, forced)
+
+    st = stats()[name]
+    assert st["expired"] == 1 and st["forced"] == 1 and st["acquired"] == 2
+
+
+def test_stats_drop_reclaimed_holds(monkeypatch):
+    """被强制清除 / 过期回收的 token 不再保留持有起点；记录数有上限"""
+    from lebase import lock
+
+    name = "test_stats_drop"
+    token = acquire(name, duration=60, timeout=5)
+    assert token in lock._holdStarts
+    release(name, "FORCE")
+    assert token not in lock._holdStarts
+
+    token = acquire(name, duration=1, timeout=5)
+    time.sleep(1.1)
+    release(name, acquire(name, duration=60, timeout=5))  # 回收过期的锁
+    assert token not in lock._holdStarts
+
+    monkeypatch.setattr(lock, "HOLD_STARTS_MAX", len(lock._holdStarts) + 1)
+    tokens = [acquire("{}_{}".format(name, i), duration=60, timeout=5) for i in range(3)]
+    assert tokens[0] not in lock._holdStarts and tokens[2] in lock._holdStarts
+    for i, t in enumerate(tokens):
+        release("{}_{}".format(name, i), t)
+
+
+def test_stats_timeout_only_for_timeouts():
+    """只有超时（GIVEUP 返回 None 或 LockAcquisitionTimeoutError）计为 timeout，其它异常不计"""
+    name = "test_stats_errors"
+    with pytest.raises(ValueError):
+        acquire(name, timeout=1, backend="nope")
+    assert name not in stats()
+
+    holder = acquire(name, duration=60, timeout=5)
+    with pytest.raises(LockAcquisitionTimeoutError):
+        acquire(name, timeout=0.2, retry=1)
+    assert acquire(name, **GIVEUP_FAST) is None
+    release(name, holder)
+    assert stats()[name]["timeout"] == 2
+
+
+def test_stats_event_log(tmp_path):
+    """事件追加到 JSONL 文件，并可离线汇总；hook 收到相同的事件"""
+    name = "test_stats_events"
+    path = tmp_path / "events.jsonl"
+    records = []
+    set_event_log(path)
+    add_hook(records.append)
+    try:
+        for _ in range(3):
+            release(name, acquire(name, duration=60, timeout=5))
+    finally:
+        remove_hook(records.append)
+        set_event_log(None)
+
+    assert [r["event"] for r in records] == ["acquired", "release"] * 3
+    st = summarize_events(path)[name]
+    assert st["acquired"] == 3 and st["hold"]["count"] == 3
+
+    from lebase.lock_stats import format_table
+
+    assert name in format_table(summarize_events(path))
+
+
+def test_acquire_async_cancelled(monkeypatch):
+    """尝试获取的线程仍在运行时任务被取消，不应留下无人持有的锁"""
+    from lebase import lock
+
+    lock_name = "test_async_cancel"
+    tryLockFile = lock._try_lock_file
+
+    def slow_try_lock_file(*args):
+        time.sleep(0.2)
+        return tryLockFile(*args)
+
+    monkeypatch.setattr(lock, "_try_lock_file", slow_try_lock_file)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(acquire_async(lock_name, duration=600, timeout=5), 0.05)
+
+    asyncio.run(main())
+    assert lock_name + ".lock" not in query()
+    monkeypatch.undo()
+    token = acquire(lock_name, **GIVEUP_FAST)
+    assert token is not None
+    release(lock_name, token)
+
+
+def test_renew_after_reclaim(monkeypatch):
+    """比较与改写之间锁被其它进程回收时续租失败，不覆盖新持有者的锁；过期的 token 不再续租"""
+    from lebase import lock
+
+    lock_name = "test_renew_reclaimed"
+    token = acquire(lock_name, duration=60, timeout=5)
+    lockFile = get_lock_file_path(lock_name)
+    other = "{}-other.py-1_1-{}-60".format(lock_name, int(time.time()))
+    writeToken = lock.write_token_to_file
+
+    def reclaim_then_write(path, newToken):
+        writeToken(lockFile, other)  # 模拟其它进程在写临时文件期间回收了锁
+        writeToken(path, newToken)
+
+    monkeypatch.setattr(lock, "write_token_to_file", reclaim_then_write)
+    assert renew(lock_name, token) is None
+    monkeypatch.undo()
+    assert lock.read_token_from_file(lockFile) == other
+
+    expired = "{}-old.py-{}_1-1000-1".format(lock_name, os.getpid())
+    write_token_to_file(lockFile, expired)
+    assert renew(lock_name, expired) is None
+    assert lock.read_token_from_file(lockFile) == expired
+    release(lock_name, "FORCE")
+
+
+def test_handoff_rejects_expired_token():
+    """上一个持有者的 token 已过期（可能已被其它进程回收）时不接手、不改写锁文件"""
+    from lebase.lock import _take_handoff, read_token_from_file
+
+    lock_name = "test_handoff_expired"
+    lockFile = get_lock_file_path(lock_name)
+    expired = "{}-old.py-{}_1-1000-1".format(lock_name, os.getpid())
+    write_token_to_file(lockFile, expired)
+    assert _take_handoff(lock_name, lockFile, expired, 60) is None
+    assert read_token_from_file(lockFile) == expired
+
+    other = "{}-other.py-1_1-{}-60".format(lock_name, int(time.time()))
+    write_token_to_file(lockFile, other)  # 已被其它进程回收
+    assert _take_handoff(lock_name, lockFile, expired, 60) is None
+    assert read_token_from_file(lockFile) == other
+    release(lock_name, "FORCE")
+
+
 def test_token_parsing():
     """测试token解析功能"""
     from lebase.lock import is_lock_expired, parse_token